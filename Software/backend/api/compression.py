@@ -0,0 +1,141 @@
+import gzip
+import zlib
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick "br" or "gzip" from an Accept-Encoding header, honouring q-values."""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+
+    wildcard = accepted.get("*", 0.0)
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_q = None, 0.0
+    for encoding in candidates:
+        q = accepted.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing text-like responses above a size threshold.
+
+    Brotli is preferred when the client accepts it and the brotli package is
+    installed, otherwise gzip is used. Responses that are already encoded or
+    not text-like (e.g. the PNG maps) are passed through as they arrive. The
+    rest is buffered only up to minimum_size: a complete body below it goes
+    out unchanged, anything longer is compressed chunk by chunk.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    def compressor(self, encoding: str):
+        """(process, finish) callables of a streaming compressor."""
+        if encoding == "br":
+            stream = brotli.Compressor(quality=self.brotli_quality)
+            return stream.process, stream.finish
+        # wbits 31 writes a gzip header and trailer
+        stream = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+        return stream.compress, stream.flush
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+        chunks = []
+        buffered = 0
+        stream = None
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough, buffered, stream
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if "content-encoding" in headers or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+            if passthrough or message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if stream is not None:
+                process, finish = stream
+                data = process(body) + (b"" if more_body else finish())
+                if data or not more_body:
+                    await send({"type": "http.response.body", "body": data, "more_body": more_body})
+                return
+
+            chunks.append(body)
+            buffered += len(body)
+            if more_body and buffered < self.minimum_size:
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            body = b"".join(chunks)
+            chunks.clear()
+            if not more_body:
+                # The whole body is here: compress it in one go if it is worth it
+                if len(body) >= self.minimum_size:
+                    body = self.compress(body, encoding)
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(body))
+                    headers.add_vary_header("Accept-Encoding")
+                await send(start_message)
+                await send({"type": "http.response.body", "body": body})
+                return
+
+            # Long streamed body: the compressed length is unknown, so drop Content-Length
+            stream = self.compressor(encoding)
+            if "content-length" in headers:
+                del headers["Content-Length"]
+            headers["Content-Encoding"] = encoding
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": stream[0](body), "more_body": True})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,36 @@
+from fastapi import APIRouter
+from fastapi.responses import ORJSONResponse
+from backend.benchmark import process_memory_mb, tracemalloc_report
+from backend.core.region_registry import registry
+from backend.core.route_sessions import route_sessions
+from backend.core import warmup
+router = APIRouter()
+
+
+@router.get("/live", tags=["Health"])
+def live():
+    return {"status": "alive"}
+
+
+@router.get("/ready", tags=["Health"])
+def ready():
+    state = warmup.warmup_state
+    body = {
+        "status": "ready" if state.ready else "warming",
+        "warmup": state.info(),
+        "prefetch": warmup.prefetcher.info() if warmup.prefetcher is not None else None,
+        "memory": process_memory_mb(),
+        "reroute": route_sessions.info(),
+        **registry.status(),
+    }
+    return ORJSONResponse(body, status_code=200 if state.ready else 503)
+
+
+@router.get("/memory", tags=["Health"])
+def memory():
+    # Sizing walks every graph, so this is slower than /ready on large regions
+    return {
+        "process": process_memory_mb(),
+        "tracemalloc": tracemalloc_report(),
+        "regions": registry.memory_report(),
+    }
@@ -1,15 +1,20 @@
 from fastapi import APIRouter, HTTPException
-from backend.models.route import RouteRequest, RouteResponse
-from typing import List, Dict
-import osmnx as ox
+from fastapi.responses import ORJSONResponse
+from backend.models.route import RouteRequest, RouteResponse, RerouteRequest, RerouteResponse
+from backend.models.isochrone import IsochroneRequest, IsochroneResponse
+from backend.models.traffic import EdgeUpdate, TrafficUpdateRequest, TrafficUpdateResponse
+from typing import List, Dict, Union
+from pydantic import ValidationError
 import os
-from backend.core.vector_db import VectorDatabase
-from backend.core.osm_data_loader import fetch_osm_data
-from backend.core.analyze import analyze_network, visualize_full_network, visualize_network_3d
+import time
+from shapely.geometry import box
+from backend.benchmark import stage
+from backend.core.region_registry import registry, radius_bbox, Region
+from backend.core.route_sessions import route_sessions
+from backend.core.weight_overlay import load_traffic_feed, traffic_feed_path
+from backend.core.geometry import encode_polyline, simplify_for_zoom
 router = APIRouter()
 
-db = VectorDatabase(vector_size=64)
-
 def WriteConsoleOutput(result) -> None:
     print("===================== Optimal Route ====================")
     print("Optimal Result:")
@@ -24,10 +29,81 @@ def WriteConsoleOutput(result) -> None:
     print("========================================================")
 
 
+# Corridor half-width of the first download, doubled each time no path is found
+CORRIDOR_BUFFER_KM = 2
+CORRIDOR_ATTEMPTS = 3
+
+
+def get_region(route_coords, fetch_mode: str = "corridor", buffer_km: float = CORRIDOR_BUFFER_KM,
+               refresh: bool = False) -> Region:
+    """Serve the request from a loaded region, downloading and embedding one on a miss."""
+    if not refresh:
+        registry.record_request(route_coords)
+    region = None if refresh else registry.find(route_coords)
+    if region is not None:
+        print(f"Using loaded region '{region.name}'")
+        return region
+
+    from backend.core.osm_data_loader import fetch_osm_data
+    osm_result = fetch_osm_data(route_coords, mode=fetch_mode, corridor_buffer_km=buffer_km)
+    name = "route:" + "|".join(f"{lat:.4f},{lon:.4f}" for lat, lon in route_coords)
+    return registry.register(name, osm_result["graph"], source="download", area=osm_result["area"])
+
+
+# Download radius for isochrones outside loaded regions: 60 km/h over the largest band, capped
+ISOCHRONE_KMH = 60
+ISOCHRONE_MAX_RADIUS_KM = 40
+
+
+def get_point_region(coords, radius_km: float) -> Region:
+    registry.record_request([coords])
+    # A region that only contains the point would cut the isochrone off at its own boundary
+    bbox = radius_bbox(coords[0], coords[1], radius_km)
+    region = registry.find([coords], bbox=bbox)
+    if region is not None:
+        print(f"Using loaded region '{region.name}'")
+        return region
+
+    from backend.core.osm_data_loader import download_bbox_graph
+    graph = download_bbox_graph(bbox)
+    name = f"point:{coords[0]:.4f},{coords[1]:.4f}:{radius_km:g}km"
+    return registry.register(name, graph, source="download", area=box(*bbox))
+
+
+def build_route_response(result: dict, data: Union[RouteRequest, RerouteRequest], route_type: str, index=None) -> RouteResponse:
+    # Results come from our own router, so skip re-validating thousands of waypoints
+    waypoints = [list(w) for w in result["waypoints"]]
+    if data.zoom is not None:
+        waypoints = simplify_for_zoom(waypoints, data.zoom)
+
+    geometry = {}
+    if data.geometry == "polyline":
+        geometry["polyline"] = encode_polyline(waypoints, data.precision)
+        geometry["precision"] = data.precision
+    else:
+        geometry["waypoints"] = waypoints
+
+    return RouteResponse.model_construct(
+        index=index,
+        type=route_type,
+        path=result["path"] if data.include_path else None,
+        distance_km=result["distance_km"],
+        ideal_time_min=result["ideal_time_min"],
+        realistic_time_min=result["realistic_time_min"],
+        average_speed_kmh=result["average_speed_kmh"],
+        path_details=result.get("path_details") if data.include_path_details else None,
+        **geometry,
+    )
+
+
+def route_to_dict(route: RouteResponse) -> dict:
+    # Reading the constructed fields directly is much cheaper than model_dump for long routes
+    return {key: value for key, value in vars(route).items() if value is not None}
+
+
 # --- Optimal Route ---
-@router.post("/optimal", tags=["Routing"], response_model=RouteResponse)
+@router.post("/optimal", tags=["Routing"], response_model=RouteResponse, response_model_exclude_none=True)
 def get_optimal_route(data: RouteRequest):
-    global OSMGraph, OSMNodes 
     try:
         start_coords = data.source_coords
         end_coords = data.dest_coords
@@ -36,35 +112,38 @@ def get_optimal_route(data: RouteRequest):
 
         route_coords = [start_coords, end_coords]
 
-        osm_result = fetch_osm_data(route_coords)
-        OSMGraph = osm_result["graph"]
-        OSMNodes = osm_result["nodes"]
-
-        db.create_embeddings(OSMGraph)
+        with stage("region"):
+            region = get_region(route_coords, data.fetch_mode)
 
-        result = db.find_optimal_route(
-            source_coords=start_coords,
-            dest_coords=end_coords
-        )
+        for attempt in range(1, CORRIDOR_ATTEMPTS + 1):
+            result = region.db.find_optimal_route(
+                source_coords=start_coords,
+                dest_coords=end_coords,
+                snap=data.snap,
+                metric=data.metric,
+                render_maps=data.render_maps
+            )
+            # A narrow corridor can miss the connecting roads, widen it and download again
+            no_path = result.get("error", "").startswith("No path")
+            if not no_path or data.fetch_mode != "corridor" or attempt == CORRIDOR_ATTEMPTS:
+                break
+            buffer_km = CORRIDOR_BUFFER_KM * 2 ** attempt
+            print(f"No path in corridor, widening to {buffer_km} km")
+            with stage("region"):
+                region = get_region(route_coords, data.fetch_mode, buffer_km=buffer_km, refresh=True)
 
         if "error" in result:
             raise HTTPException(status_code=400, detail=result["error"])
 
-        if not result.get("path"):
+        # An empty path is a valid route along the one road both points snap to
+        if result.get("path") is None or not result.get("waypoints"):
             raise HTTPException(status_code=404, detail="No route found between the specified coordinates.")
 
         WriteConsoleOutput(result)
 
-        return RouteResponse(
-            index=None,
-            type="optimal",
-            path=result["path"],
-            distance_km=result["distance_km"],
-            ideal_time_min=result["ideal_time_min"],
-            realistic_time_min=result["realistic_time_min"],
-            average_speed_kmh=result["average_speed_kmh"],
-            waypoints=result["waypoints"],
-        )
+        with stage("serialize"):
+            route = build_route_response(result, data, "optimal")
+            return ORJSONResponse(route_to_dict(route))
 
     except HTTPException as e:
         raise e
@@ -73,27 +152,136 @@ def get_optimal_route(data: RouteRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 # --- Alternative Routes ---
-@router.post("/alternative", tags=["Routing"], response_model=Dict[str, List[RouteResponse]])
+@router.post("/alternative", tags=["Routing"], response_model=Dict[str, List[RouteResponse]], response_model_exclude_none=True)
 def get_alternative_routes(data: RouteRequest):
-    global OSMGraph, OSMNodes  # ← ADD THIS
-
-    if OSMGraph is None or OSMNodes is None:
+    with stage("region"):
+        region = registry.find([data.source_coords, data.dest_coords])
+    if region is None:
         raise HTTPException(status_code=400, detail="No route has been calculated yet")
 
-    result = db.find_alternative_routes(
+    result = region.db.find_alternative_routes(
         source_coords=data.source_coords,
-        dest_coords=data.dest_coords
+        dest_coords=data.dest_coords,
+        render_maps=data.render_maps
     )
 
     if "error" in result:
         raise HTTPException(status_code=400, detail=result["error"])
 
-    return {"alternatives": result["alternatives"]}
+    with stage("serialize"):
+        return ORJSONResponse({"alternatives": [
+            route_to_dict(build_route_response(alt, data, "alternative", index=alt["index"]))
+            for alt in result["alternatives"]
+        ]})
+
+
+# --- Interactive re-routing ---
+@router.post("/reroute", tags=["Routing"], response_model=RerouteResponse, response_model_exclude_none=True)
+def reroute(data: RerouteRequest):
+    """
+    Route for a dragged marker, reusing the session's shortest-path tree from the same source.
+
+    Only loaded regions are used and no maps are rendered, so moving the
+    destination costs a tree lookup or a short extension of its frontier.
+    """
+    with stage("region"):
+        region = registry.find([data.source_coords, data.dest_coords])
+    if region is None:
+        raise HTTPException(status_code=400, detail="No loaded region covers the route, request /route/optimal first")
+
+    with stage("search"):
+        session = route_sessions.get_or_create(data.session_id, region)
+        result = session.route(data.source_coords, data.dest_coords, data.metric)
+
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+
+    with stage("serialize"):
+        route = build_route_response(result, data, "reroute")
+        return ORJSONResponse({**route_to_dict(route), "session": result["session"]})
+
+
+@router.delete("/reroute/{session_id}", tags=["Routing"])
+def close_reroute_session(session_id: str):
+    if not route_sessions.close(session_id):
+        raise HTTPException(status_code=404, detail="Unknown or expired session")
+    return {"closed": session_id}
+
+
+# --- Isochrone ---
+@router.post("/isochrone", tags=["Routing"], response_model=IsochroneResponse, response_model_exclude_none=True)
+def get_isochrone(data: IsochroneRequest):
+    try:
+        radius_km = min(max(data.minutes) / 60 * ISOCHRONE_KMH, ISOCHRONE_MAX_RADIUS_KM)
+        region = get_point_region(data.coords, radius_km)
+
+        result = region.db.find_isochrone(
+            data.coords,
+            minutes=data.minutes,
+            include_nodes=data.include_nodes,
+            hull_ratio=data.hull_ratio
+        )
+
+        if "error" in result:
+            raise HTTPException(status_code=400, detail=result["error"])
+
+        return ORJSONResponse(result)
+
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        print(f"Unexpected error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# --- Live traffic ---
+@router.post("/traffic", tags=["Routing"], response_model=TrafficUpdateResponse)
+def update_traffic(data: TrafficUpdateRequest):
+    start = time.perf_counter()
+    updates = [update.model_dump() for update in data.updates]
+    if data.feed_file:
+        try:
+            path = traffic_feed_path(data.feed_file)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not os.path.isfile(path):
+            raise HTTPException(status_code=400, detail=f"Traffic feed {data.feed_file} not found")
+        try:
+            rows = load_traffic_feed(path)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Unreadable traffic feed {data.feed_file}: {e}")
+        # Feed rows get the same checks as request updates (ids present, positive speeds)
+        for row_number, row in enumerate(rows, start=1):
+            try:
+                updates.append(EdgeUpdate.model_validate(row).model_dump())
+            except ValidationError as e:
+                raise HTTPException(status_code=422, detail={
+                    "feed_row": row_number,
+                    "errors": e.errors(include_url=False, include_context=False, include_input=False),
+                })
+
+    # Reset only once the whole feed is known to be valid
+    if data.reset:
+        registry.reset_traffic()
+    regions = registry.apply_traffic(updates)
+    return {
+        "received": len(updates),
+        "elapsed_ms": (time.perf_counter() - start) * 1000,
+        "regions": regions,
+    }
+
+
+@router.get("/traffic", tags=["Routing"])
+def get_traffic():
+    return {region["name"]: region["traffic"] for region in registry.status()["regions"]}
 
 
 # --- Graphs for optimal route ---
 @router.get("/graphs", tags=["Routing"], response_model=Dict[str, str])
 def generate_graphs():
+    # osmnx and the plotting stack load on first use, keeping them out of startup
+    import osmnx as ox
+    from backend.core.analyze import analyze_network, visualize_full_network, visualize_network_3d
     try:
         base_dir = os.path.dirname(os.path.abspath(__file__))
 
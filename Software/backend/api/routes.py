@@ -1,6 +1,6 @@
 from fastapi import APIRouter
-from .endpoints import routing
+from .endpoints import routing, health
 
 api_router = APIRouter()
 api_router.include_router(routing.router, prefix="/route", tags=["Routing"])
-
+api_router.include_router(health.router, prefix="/health", tags=["Health"])
@@ -0,0 +1,41 @@
+import re
+import time
+
+from starlette.datastructures import MutableHeaders
+
+from backend.benchmark import start_stage_timing
+
+
+def format_server_timing(stages, total_s: float) -> str:
+    parts = [f"{re.sub(r'[^A-Za-z0-9_-]', '_', name)};dur={seconds * 1000:.2f}" for name, seconds in stages.items()]
+    parts.append(f"total;dur={total_s * 1000:.2f}")
+    return ", ".join(parts)
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware adding a Server-Timing header with the request's stage times.
+
+    Stages are functions decorated with @benchmark and blocks wrapped in
+    stage(); "total" is the time until the response headers are sent, so
+    when this wraps CompressionMiddleware it includes compression.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stages = start_stage_timing()
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", format_server_timing(stages, time.perf_counter() - start))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
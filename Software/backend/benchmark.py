@@ -1,5 +1,13 @@
+import resource
 import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
 from functools import wraps
+from typing import Dict, Optional
+
+# Seconds per stage of the request being served, reported in its Server-Timing header
+_stage_times: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_times", default=None)
 
 def benchmark(log_to_file=True):
     def decorator(func):
@@ -11,6 +19,7 @@ def benchmark(log_to_file=True):
             elapsed = end - start
             
             print(f"{func.__name__} executed in {elapsed:.4f} seconds")
+            record_stage(func.__name__, elapsed)
             
             if log_to_file:
                 log_metrics(func.__name__, elapsed)
@@ -19,6 +28,59 @@ def benchmark(log_to_file=True):
         return wrapper
     return decorator
 
+def start_stage_timing() -> Dict[str, float]:
+    """Collect stage times for the current request; thread-pool endpoints share the same dict."""
+    stages = {}
+    _stage_times.set(stages)
+    return stages
+
+def record_stage(name, elapsed):
+    stages = _stage_times.get()
+    if stages is not None:
+        stages[name] = stages.get(name, 0.0) + elapsed
+
+@contextmanager
+def stage(name):
+    """Time a block as a named stage of the current request (nested stages overlap)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
 def log_metrics(func_name, elapsed_time):
     with open('performance.log', 'a') as f:
-        f.write(f"{func_name},{elapsed_time:.4f},{time.strftime('%Y-%m-%d %H:%M:%S')}\n")
\ No newline at end of file
+        f.write(f"{func_name},{elapsed_time:.4f},{time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+
+def process_memory_mb():
+    """Current and peak resident set size of this process in MB (ru_maxrss is in KB on Linux)."""
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    current_mb = None
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    current_mb = int(line.split()[1]) / 1024
+                    break
+    except OSError:
+        pass
+    return {"rss_mb": round(current_mb, 1) if current_mb is not None else None, "peak_rss_mb": round(peak_mb, 1)}
+
+def traced_memory_mb():
+    """Python heap currently allocated as seen by tracemalloc, None when not tracing."""
+    if not tracemalloc.is_tracing():
+        return None
+    return tracemalloc.get_traced_memory()[0] / 1024 ** 2
+
+def tracemalloc_report(limit=10):
+    """Traced heap and the source lines allocating most of it; tracing starts with TRACEMALLOC=<frames>."""
+    if not tracemalloc.is_tracing():
+        return {"tracing": False}
+    current, peak = tracemalloc.get_traced_memory()
+    top = tracemalloc.take_snapshot().statistics("lineno")[:limit]
+    return {
+        "tracing": True,
+        "current_mb": round(current / 1024 ** 2, 1),
+        "peak_mb": round(peak / 1024 ** 2, 1),
+        "top": [{"where": str(stat.traceback), "mb": round(stat.size / 1024 ** 2, 2), "count": stat.count} for stat in top],
+    }
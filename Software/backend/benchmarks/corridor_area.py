@@ -0,0 +1,55 @@
+"""
+Downloaded area of the padded bounding box vs the route corridor by route length.
+
+Routes run diagonally (north-east) from Varaždin. Bounding boxes use the
+fetch_osm_data default padding around ~3 km city boundaries. The edge
+estimate applies the road density of the Varaždin raw export, so it only
+indicates how graph size and embedding cost scale.
+
+Run from the Software directory:
+    python -m backend.benchmarks.corridor_area
+"""
+import math
+
+import osmnx as ox
+from shapely.geometry import box
+
+from backend.core.osm_data_loader import corridor_polygon, load_raw_export
+from backend.core.region_registry import graph_bbox
+
+RAW_EXPORT = "../Documentation/Varaždin Highway RAW data - generic format.json"
+START = (46.3057, 16.3366)
+ROUTE_KM = [10, 25, 50, 100, 200, 400]
+CITY_RADIUS_KM = 3
+PADDING_KM = 5
+BUFFER_KM = 2
+
+
+def area_km2(polygon) -> float:
+    projected, _ = ox.projection.project_geometry(polygon)
+    return projected.area / 1e6
+
+
+def main():
+    graph = load_raw_export(RAW_EXPORT)
+    edges_per_km2 = graph.number_of_edges() / area_km2(box(*graph_bbox(graph)))
+
+    print(f"{'route km':>8} {'bbox km2':>10} {'corridor km2':>13} {'ratio':>6} {'bbox edges':>11} {'corridor edges':>15}")
+    for route_km in ROUTE_KM:
+        step_km = route_km / math.sqrt(2)
+        lat_deg = step_km / 111
+        lon_deg = step_km / (111 * math.cos(math.radians(START[0])))
+        end = (START[0] + lat_deg, START[1] + lon_deg)
+
+        pad = CITY_RADIUS_KM + PADDING_KM
+        pad_lat, pad_lon = pad / 111, pad / (111 * math.cos(math.radians(START[0])))
+        bbox = box(START[1] - pad_lon, START[0] - pad_lat, end[1] + pad_lon, end[0] + pad_lat)
+        corridor = corridor_polygon([START, end], BUFFER_KM)
+
+        bbox_km2, corridor_km2 = area_km2(bbox), area_km2(corridor)
+        print(f"{route_km:>8} {bbox_km2:>10,.0f} {corridor_km2:>13,.0f} {bbox_km2 / corridor_km2:>6.1f} "
+              f"{bbox_km2 * edges_per_km2:>11,.0f} {corridor_km2 * edges_per_km2:>15,.0f}")
+
+
+if __name__ == "__main__":
+    main()
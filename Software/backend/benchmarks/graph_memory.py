@@ -0,0 +1,85 @@
+"""
+Memory of a loaded region with and without graph slimming.
+
+Each mode runs in its own process so peak RSS is not shared: the process
+builds a synthetic region with osmnx-like tags and geometries (all osmnx
+default tags in "full", ROUTING_WAY_TAGS when slimmed), indexes it
+like VectorDatabase.create_embeddings does (edge index, optional slimming,
+weight overlay, landmarks) and answers two alternatives-style conversions
+to a simple graph, cached when slimmed as in find_alternative_routes.
+Qdrant embeddings are left out, they are the same in both modes.
+
+Run from the Software directory:
+    python -m backend.benchmarks.graph_memory [--size 512]
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from contextlib import nullcontext
+
+from backend.benchmark import process_memory_mb
+from backend.benchmarks.synthetic import grid_road_graph
+from backend.core.edge_index import EdgeIndex
+from backend.core.graph_slim import graph_sizeof, slim_graph
+from backend.core.landmarks import LandmarkIndex
+from backend.core.osm_data_loader import routing_tags
+from backend.core.vector_db import REALISTIC_FACTOR, SPEED_LIMITS, _convert_to_simple_graph
+from backend.core.weight_overlay import WeightOverlay
+
+MB = 1024 ** 2
+
+
+def run_mode(size: int, slim: bool) -> dict:
+    start = time.perf_counter()
+    # Slimmed regions are parsed with the loader's routing tags only
+    with routing_tags() if slim else nullcontext():
+        graph = grid_road_graph(size, osm_tags=True)
+    loaded_mb = graph_sizeof(graph) / MB
+    if slim:
+        slim_graph(graph, keep_geometry=True)
+    edge_index = EdgeIndex(graph)
+    if slim:
+        slim_graph(graph)
+    overlay = WeightOverlay(graph, SPEED_LIMITS, REALISTIC_FACTOR)
+    landmarks = LandmarkIndex.build(graph, count=4)
+
+    simple_graph = None
+    for _ in range(2):
+        if simple_graph is None or not slim:
+            simple_graph = _convert_to_simple_graph(graph)
+
+    return {
+        "edges": graph.number_of_edges(),
+        "seconds": time.perf_counter() - start,
+        "loaded_graph_mb": loaded_mb,
+        "graph_mb": graph_sizeof(graph) / MB,
+        "simple_graph_mb": graph_sizeof(simple_graph) / MB,
+        **process_memory_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=512, help="Grid side, about 4 * size^2 edges")
+    parser.add_argument("--mode", choices=["full", "slim"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.size, slim=args.mode == "slim")))
+        return
+
+    print(f"{'mode':<6} {'edges':>10} {'loaded MB':>10} {'graph MB':>9} {'simple MB':>10} {'rss MB':>8} {'peak rss MB':>12} {'s':>6}")
+    for mode in ("full", "slim"):
+        out = subprocess.run(
+            [sys.executable, "-m", "backend.benchmarks.graph_memory", "--size", str(args.size), "--mode", mode],
+            capture_output=True, text=True, check=True
+        ).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"{mode:<6} {r['edges']:>10,} {r['loaded_graph_mb']:>10.0f} {r['graph_mb']:>9.0f} {r['simple_graph_mb']:>10.0f} "
+              f"{r['rss_mb']:>8.0f} {r['peak_rss_mb']:>12.0f} {r['seconds']:>6.0f}")
+
+
+if __name__ == "__main__":
+    main()
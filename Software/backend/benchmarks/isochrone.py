@@ -0,0 +1,48 @@
+"""
+Isochrone latency by cutoff on a large synthetic region.
+
+The index is built without Qdrant embeddings, since isochrones only need
+the graph and the edge index.
+
+Run from the Software directory:
+    python -m backend.benchmarks.isochrone [--size 300]
+"""
+import argparse
+import time
+
+from backend.benchmarks.synthetic import grid_road_graph
+from backend.core.edge_index import EdgeIndex
+from backend.core.vector_db import REALISTIC_FACTOR, SPEED_LIMITS, VectorDatabase
+from backend.core.weight_overlay import WeightOverlay
+
+CUTOFFS_MIN = [2, 5, 10, 20, 30]
+REPEATS = 3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=300, help="Grid side, size^2 nodes")
+    args = parser.parse_args()
+
+    graph = grid_road_graph(args.size)
+    db = VectorDatabase(vector_size=64)
+    db.graph = graph
+    db.edge_index = EdgeIndex(graph)
+    db.overlay = WeightOverlay(graph, SPEED_LIMITS, REALISTIC_FACTOR)
+    center = graph.nodes[(args.size // 2) * args.size + args.size // 2]
+    coords = [center["y"], center["x"]]
+
+    print(f"{graph.number_of_nodes():,} nodes, {graph.number_of_edges():,} edges")
+    print(f"{'cutoff min':>10} {'settled':>9} {'1 band ms':>10} {'3 bands ms':>11}")
+    for cutoff in CUTOFFS_MIN:
+        timings = {}
+        for label, bands in (("single", [cutoff]), ("three", [cutoff / 3, 2 * cutoff / 3, cutoff])):
+            start = time.perf_counter()
+            for _ in range(REPEATS):
+                result = db.find_isochrone.__wrapped__(db, coords, bands, include_nodes=False)
+            timings[label] = (time.perf_counter() - start) * 1000 / REPEATS
+        print(f"{cutoff:>10} {result['settled_nodes']:>9,} {timings['single']:>10.1f} {timings['three']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
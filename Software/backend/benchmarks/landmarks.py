@@ -0,0 +1,110 @@
+"""
+ALT landmark bounds vs plain Dijkstra for edge-snapped routes.
+
+For each landmark count, reports preprocessing (landmark selection and
+distance vectors), storing the vectors in Qdrant, their size, and for the
+same random routes the settled nodes and latency of Dijkstra and A*.
+Path costs between the snapped end nodes are checked to be equal.
+Finally the stored vectors are queried with similar_nodes, comparing the
+road distance to the most similar nodes with that to random nodes.
+
+Run from the Software directory:
+    python -m backend.benchmarks.landmarks [--size 200] [--routes 50]
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from backend.benchmarks.synthetic import grid_road_graph
+from backend.core.edge_index import EdgeIndex
+from backend.core.osm_data_loader import load_raw_export
+from backend.core.region_registry import graph_bbox
+from backend.core.search import bounded_dijkstra
+from backend.core.vector_db import REALISTIC_FACTOR, ROUTE_METRICS, SPEED_LIMITS, VectorDatabase
+from backend.core.weight_overlay import WeightOverlay
+
+RAW_EXPORT = "../Documentation/Varaždin Highway RAW data - generic format.json"
+LANDMARK_COUNTS = [4, 8, 16]
+
+
+def run_routes(db, queries, metric, use_landmarks):
+    settled, costs = [], []
+    start = time.perf_counter()
+    for source, dest in queries:
+        stats = {}
+        path, _, _ = db._route_from_edge_snaps(source, dest, metric, use_landmarks=use_landmarks, stats=stats)
+        settled.append(stats.get("settled", 0))
+        weight = db.overlay.weight(ROUTE_METRICS[metric])
+        costs.append(round(sum(weight(u, v, db.graph[u][v]) for u, v in zip(path[:-1], path[1:])), 6)
+                     if path is not None else None)
+    ms = (time.perf_counter() - start) * 1000 / len(queries)
+    return np.array(settled), ms, costs
+
+
+def bench_similarity(db, graph, samples: int = 20, limit: int = 10):
+    """Latency of similar_nodes and road distance to its hits vs to random nodes."""
+    rng = random.Random(1)
+    nodes = list(graph.nodes)
+    weight = db.overlay.weight("length")
+    query_ms, similar_km, random_km = [], [], []
+    for node in rng.sample(nodes, samples):
+        start = time.perf_counter()
+        hits = db.similar_nodes(node, limit=limit)
+        query_ms.append((time.perf_counter() - start) * 1000)
+        distances = bounded_dijkstra(graph, {node: 0}, cutoff=float("inf"), weight=weight)
+        similar_km += [distances.get(hit["node"], np.nan) / 1000 for hit in hits]
+        random_km += [distances.get(other, np.nan) / 1000 for other in rng.sample(nodes, limit)]
+    print(f"similar_nodes with {db.landmark_count} landmarks: {np.median(query_ms):.2f} ms per query, "
+          f"{limit} most similar nodes {np.nanmean(similar_km):.2f} km away by road, random nodes {np.nanmean(random_km):.2f} km")
+
+
+def bench_region(label, graph, routes, metric):
+    print(f"\n{label}: {graph.number_of_nodes():,} nodes, {graph.number_of_edges():,} edges, metric={metric}")
+    west, south, east, north = graph_bbox(graph)
+    rng = random.Random(0)
+    queries = [
+        ([rng.uniform(south, north), rng.uniform(west, east)], [rng.uniform(south, north), rng.uniform(west, east)])
+        for _ in range(routes)
+    ]
+
+    db = VectorDatabase(vector_size=64, landmarks=0)
+    db.graph = graph
+    db.edge_index = EdgeIndex(graph)
+    db.overlay = WeightOverlay(graph, SPEED_LIMITS, REALISTIC_FACTOR)
+    base_settled, base_ms, base_paths = run_routes(db, queries, metric, use_landmarks=False)
+
+    print(f"{'landmarks':>9} {'build s':>8} {'store s':>8} {'MB':>6} {'settled':>9} {'reduction':>10} {'ms/route':>9} {'speedup':>8}")
+    print(f"{'dijkstra':>9} {'':>8} {'':>8} {'':>6} {base_settled.mean():>9,.0f} {'':>10} {base_ms:>9.1f} {'':>8}")
+    for count in LANDMARK_COUNTS:
+        db.landmark_count = count
+        start = time.perf_counter()
+        db.landmark_index = db._init_landmarks(graph, meta={})
+        store_s = time.perf_counter() - start - db.landmark_index.build_seconds
+
+        settled, ms, paths = run_routes(db, queries, metric, use_landmarks=True)
+        mismatches = sum(a != b for a, b in zip(paths, base_paths))
+        info = db.landmark_index.info()
+        print(f"{count:>9} {info['build_seconds']:>8.2f} {store_s:>8.2f} {info['vector_mb']:>6.2f} "
+              f"{settled.mean():>9,.0f} {base_settled.mean() / settled.mean():>9.1f}x {ms:>9.1f} {base_ms / ms:>7.1f}x"
+              + (f"  ({mismatches} routes differ in cost)" if mismatches else ""))
+    if metric == "distance":
+        bench_similarity(db, graph)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=200, help="Synthetic grid side, size^2 nodes")
+    parser.add_argument("--routes", type=int, default=50)
+    args = parser.parse_args()
+
+    varazdin = load_raw_export(RAW_EXPORT)
+    bench_region("Varaždin export", varazdin, args.routes, "distance")
+    grid = grid_road_graph(args.size)
+    bench_region("synthetic grid", grid, args.routes, "distance")
+    bench_region("synthetic grid", grid, args.routes, "time")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Concurrent load test for the routing API.
+
+Replays a weighted mix of /route/optimal, /route/alternative and
+/route/graphs requests between random nodes of an offline region (the
+first preload entry of backend/config/regions.json) at each concurrency
+level. Runs the app in-process over an ASGI transport, with its lifespan
+and warm-up, or against a running server with --url.
+
+Per level and endpoint it reports throughput, p50/p95/p99 latency, error
+rate and the mean per-stage breakdown from the Server-Timing header.
+Results are saved as JSON; --compare prints the change against an
+earlier run.
+
+Run from the Software directory:
+    python -m backend.benchmarks.load_test [--url http://127.0.0.1:8000]
+        [--concurrency 1 4 16] [--requests 100] [--mix optimal=8,alternative=2,graphs=0]
+        [--compare backend/data/loadtests/<earlier run>.json] [--render-maps]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+import networkx as nx
+import numpy as np
+
+from backend.core.region_registry import EDGE_MARGIN_DEG, graph_bbox
+from backend.core.warmup import load_region_config, load_region_graph
+
+RESULTS_DIR = "backend/data/loadtests"
+DEFAULT_MIX = "optimal=8,alternative=2,graphs=0"
+READY_TIMEOUT_S = 300
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ("optimal", "alternative", "graphs"):
+            raise ValueError(f"Unknown endpoint '{name}' in --mix")
+        weights[name.strip()] = float(weight or 1)
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+
+def region_points(graph) -> List[List[float]]:
+    """
+    Node coordinates far enough inside the region for the registry to serve them.
+
+    Only the largest strongly connected component is used: unreachable pairs
+    would make /optimal widen its corridor and try to download more area.
+    """
+    west, south, east, north = graph_bbox(graph)
+    pad = EDGE_MARGIN_DEG * 1.5
+    connected = max(nx.strongly_connected_components(graph), key=len)
+    return [
+        [data["y"], data["x"]] for node, data in graph.nodes(data=True)
+        if node in connected and west + pad <= data["x"] <= east - pad and south + pad <= data["y"] <= north - pad
+    ]
+
+
+def build_requests(points: List[List[float]], mix: Dict[str, float], count: int, seed: int,
+                   render_maps: bool = False) -> List[Dict]:
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    requests = []
+    for _ in range(count):
+        name = rng.choices(names, weights)[0]
+        if name == "graphs":
+            requests.append({"endpoint": name, "method": "GET", "url": "/route/graphs"})
+            continue
+        source, dest = rng.sample(points, 2)
+        requests.append({
+            "endpoint": name,
+            "method": "POST",
+            "url": f"/route/{name}",
+            "json": {"source_coords": source, "dest_coords": dest, "render_maps": render_maps},
+        })
+    return requests
+
+
+def parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    stages = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if params.startswith("dur="):
+            stages[name] = float(params[4:])
+    return stages
+
+
+async def run_level(client: httpx.AsyncClient, requests: List[Dict], concurrency: int) -> Dict:
+    pending = iter(requests)
+    samples = []
+
+    async def worker():
+        for request in pending:
+            start = time.perf_counter()
+            try:
+                response = await client.request(request["method"], request["url"], json=request.get("json"))
+                status, stages = response.status_code, parse_server_timing(response.headers.get("server-timing"))
+            except httpx.HTTPError as e:
+                status, stages = None, {}
+                print(f"{request['url']} failed: {e}")
+            samples.append({
+                "endpoint": request["endpoint"],
+                "status": status,
+                "ms": (time.perf_counter() - start) * 1000,
+                "stages": stages,
+            })
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(samples, time.perf_counter() - start)
+
+
+def summarize(samples: List[Dict], wall_s: float) -> Dict:
+    groups = defaultdict(list)
+    for sample in sorted(samples, key=lambda sample: sample["endpoint"]):
+        groups[sample["endpoint"]].append(sample)
+    groups["all"] = samples
+
+    summary = {}
+    for endpoint, group in groups.items():
+        latencies = np.array([sample["ms"] for sample in group])
+        errors = sum(1 for sample in group if sample["status"] is None or sample["status"] >= 400)
+        stage_totals = defaultdict(float)
+        for sample in group:
+            for name, ms in sample["stages"].items():
+                stage_totals[name] += ms
+        summary[endpoint] = {
+            "requests": len(group),
+            "throughput_rps": len(group) / wall_s,
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+            "error_rate": errors / len(group),
+            "stages_ms": {name: total / len(group) for name, total in sorted(stage_totals.items())},
+        }
+    return {"wall_s": wall_s, "endpoints": summary}
+
+
+def print_level(concurrency: int, result: Dict):
+    print(f"\nconcurrency {concurrency} ({result['wall_s']:.1f} s)")
+    print(f"{'endpoint':<12} {'reqs':>5} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}  stages (mean ms)")
+    for endpoint, s in result["endpoints"].items():
+        stages = " ".join(f"{name}={ms:.1f}" for name, ms in s["stages_ms"].items())
+        print(f"{endpoint:<12} {s['requests']:>5} {s['throughput_rps']:>7.1f} {s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} "
+              f"{s['p99_ms']:>8.1f} {s['error_rate']:>7.1%}  {stages}")
+
+
+def print_comparison(current: Dict, previous: Dict):
+    print(f"\nchange against {previous['started_at']} ({previous['target']})")
+    print(f"{'level':>5} {'endpoint':<12} {'req/s':>7} {'change':>8} {'p95 ms':>8} {'change':>9}")
+    for level, result in current["levels"].items():
+        before = previous["levels"].get(level)
+        if before is None:
+            continue
+        for endpoint, s in result["endpoints"].items():
+            b = before["endpoints"].get(endpoint)
+            if b is None:
+                continue
+            rps = (s["throughput_rps"] / b["throughput_rps"] - 1) if b["throughput_rps"] else 0
+            p95 = (s["p95_ms"] / b["p95_ms"] - 1) if b["p95_ms"] else 0
+            print(f"{level:>5} {endpoint:<12} {b['throughput_rps']:>7.1f} {rps:>+8.1%} {b['p95_ms']:>8.1f} {p95:>+9.1%}")
+
+
+async def wait_until_ready(client: httpx.AsyncClient):
+    deadline = time.time() + READY_TIMEOUT_S
+    while time.time() < deadline:
+        response = await client.get("/health/ready")
+        if response.status_code == 200:
+            return
+        await asyncio.sleep(0.5)
+    raise TimeoutError("Service did not become ready")
+
+
+async def run(args, requests_per_level: List[List[Dict]], warmup: List[Dict]) -> Dict:
+    async def drive(client):
+        await wait_until_ready(client)
+        await run_level(client, warmup, concurrency=1)
+        levels = {}
+        for concurrency, requests in zip(args.concurrency, requests_per_level):
+            levels[str(concurrency)] = await run_level(client, requests, concurrency)
+            print_level(concurrency, levels[str(concurrency)])
+        return levels
+
+    timeout = httpx.Timeout(args.timeout)
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=timeout) as client:
+            return await drive(client)
+
+    from backend.main import app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=timeout) as client:
+            return await drive(client)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="Base URL of a running server, in-process when omitted")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=100, help="Requests per concurrency level")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests before the first level")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Endpoint weights, e.g. optimal=8,alternative=2,graphs=1")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help=f"Result file, default {RESULTS_DIR}/loadtest-<time>.json")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    parser.add_argument("--render-maps", action="store_true",
+                        help="Also render the route maps, which concurrent requests overwrite in turn")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    entry = load_region_config()["preload"][0]
+    graph, _ = load_region_graph(entry)
+    points = region_points(graph)
+    requests_per_level = [
+        build_requests(points, mix, args.requests, seed=args.seed + i, render_maps=args.render_maps)
+        for i in range(len(args.concurrency))
+    ]
+    warmup = build_requests(points, mix, args.warmup, seed=args.seed - 1, render_maps=args.render_maps)
+
+    started_at = time.strftime("%Y-%m-%d %H:%M:%S")
+    target = args.url or "in-process"
+    print(f"Load test against {target}: region '{entry['name']}', mix {mix}, {args.requests} requests per level")
+    levels = asyncio.run(run(args, requests_per_level, warmup))
+
+    result = {
+        "started_at": started_at,
+        "target": target,
+        "region": entry["name"],
+        "mix": mix,
+        "requests_per_level": args.requests,
+        "seed": args.seed,
+        "levels": levels,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"loadtest-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"\nSaved results to {out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Local stand-in for the Overpass API serving a raw export, for offline fetch runs.
+
+Answers osmnx's `way[...](poly:"...");>;` queries with the ways of the export
+that intersect the polygon, plus their nodes, after an optional artificial
+latency. Highway filters in the query are ignored; the export is filtered
+the same way fetch_osm_data filters downloads.
+
+Run from the Software directory, then point the backend at it:
+    python -m backend.benchmarks.overpass_standin --port 8765
+    OVERPASS_URL=http://127.0.0.1:8765/api uvicorn backend.main:app
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import shapely
+from shapely.geometry import LineString, Polygon
+
+from backend.core.osm_data_loader import DRIVE_HIGHWAY_PATTERN
+
+RAW_EXPORT = "../Documentation/Varaždin Highway RAW data - generic format.json"
+POLY_PATTERN = re.compile(r"poly:['\"]([^'\"]+)['\"]")
+
+
+class StandInOverpass:
+    def __init__(self, raw_export: str = RAW_EXPORT, port: int = 0, latency_s: float = 0.0):
+        with open(raw_export, encoding="utf-8") as f:
+            elements = json.load(f)["elements"]
+
+        highway = re.compile(DRIVE_HIGHWAY_PATTERN)
+        self.nodes = {e["id"]: e for e in elements if e["type"] == "node"}
+        self.ways = [
+            e for e in elements
+            if e["type"] == "way" and highway.search(e.get("tags", {}).get("highway", ""))
+        ]
+        self.way_lines = [
+            LineString([(self.nodes[n]["lon"], self.nodes[n]["lat"]) for n in way["nodes"]])
+            for way in self.ways
+        ]
+        self.tree = shapely.STRtree(self.way_lines)
+        self.latency_s = latency_s
+        self.requests = 0
+
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                query = parse_qs(self.rfile.read(length).decode())["data"][0]
+                body = json.dumps(standin.answer(query)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api"
+
+    def answer(self, query: str) -> dict:
+        self.requests += 1
+        time.sleep(self.latency_s)
+        coords = [float(c) for c in POLY_PATTERN.search(query).group(1).split()]
+        polygon = Polygon(zip(coords[1::2], coords[0::2]))
+
+        ways = [self.ways[i] for i in self.tree.query(polygon, predicate="intersects")]
+        node_ids = {n for way in ways for n in way["nodes"]}
+        return {
+            "version": 0.6,
+            "generator": "stand-in overpass",
+            "elements": [self.nodes[n] for n in node_ids] + ways,
+        }
+
+    def start(self) -> "StandInOverpass":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--raw-export", default=RAW_EXPORT)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    args = parser.parse_args()
+
+    standin = StandInOverpass(args.raw_export, port=args.port, latency_s=args.latency)
+    print(f"Stand-in Overpass listening on {standin.url}")
+    standin.server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
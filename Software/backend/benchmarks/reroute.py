@@ -0,0 +1,118 @@
+"""
+Drag-to-reroute: a fresh search per destination vs a session's shortest-path tree.
+
+Simulates dragging the destination marker: from a fixed source, the
+destination moves in short random steps. Each move is routed once with
+the /optimal search (ALT A* between edge snaps, without map rendering)
+and once through a RouteSession that keeps the tree from the source.
+Reports latency percentiles and settled nodes per move, and checks both
+give routes of equal cost.
+
+Run from the Software directory:
+    python -m backend.benchmarks.reroute [--size 200] [--drags 5] [--moves 50] [--step-m 150]
+"""
+import argparse
+import math
+import random
+import time
+
+import numpy as np
+
+from backend.benchmarks.synthetic import grid_road_graph
+from backend.core.edge_index import EdgeIndex
+from backend.core.landmarks import LandmarkIndex
+from backend.core.osm_data_loader import load_raw_export
+from backend.core.region_registry import Region, graph_bbox
+from backend.core.route_sessions import RouteSessionCache
+from backend.core.vector_db import REALISTIC_FACTOR, SPEED_LIMITS, VectorDatabase
+from backend.core.weight_overlay import WeightOverlay
+
+RAW_EXPORT = "../Documentation/Varaždin Highway RAW data - generic format.json"
+
+
+def drag_paths(graph, drags, moves, step_m, seed=0):
+    """(source, [destinations]) per drag, the destination taking random steps inside the bbox."""
+    west, south, east, north = graph_bbox(graph)
+    rng = random.Random(seed)
+    step_deg = step_m / 111_000
+    paths = []
+    for _ in range(drags):
+        source = [rng.uniform(south, north), rng.uniform(west, east)]
+        lat, lon = rng.uniform(south, north), rng.uniform(west, east)
+        destinations = []
+        for _ in range(moves):
+            angle = rng.uniform(0, 2 * math.pi)
+            lat = min(max(lat + step_deg * math.sin(angle), south), north)
+            lon = min(max(lon + step_deg * math.cos(angle) / math.cos(math.radians(lat)), west), east)
+            destinations.append([lat, lon])
+        paths.append((source, destinations))
+    return paths
+
+
+def route_cost(result, metric):
+    """Full route cost, including the partial edges at both ends."""
+    return round(result["realistic_time_min"] if metric == "time" else result["distance_km"], 6)
+
+
+def bench_region(label, graph, args, metric):
+    print(f"\n{label}: {graph.number_of_nodes():,} nodes, {graph.number_of_edges():,} edges, metric={metric}")
+    db = VectorDatabase(vector_size=64, landmarks=0)
+    db.graph = graph
+    db.edge_index = EdgeIndex(graph)
+    db.overlay = WeightOverlay(graph, SPEED_LIMITS, REALISTIC_FACTOR)
+    db.landmark_index = LandmarkIndex.build(graph, count=8, weight=db.overlay.weight("length"))
+    sessions = RouteSessionCache()
+    region = Region(label, db, source="benchmark")
+
+    fresh_ms, fresh_settled, tree_ms, tree_settled, first_ms = [], [], [], [], []
+    mismatches = 0
+    for source, destinations in drag_paths(graph, args.drags, args.moves, args.step_m):
+        session = sessions.get_or_create(None, region)
+        for i, dest in enumerate(destinations):
+            stats = {}
+            start = time.perf_counter()
+            path, src, dst = db._route_from_edge_snaps(source, dest, metric, stats=stats)
+            fresh = db._route_result(path, metric, src, dst) if path is not None else None
+            fresh_ms.append((time.perf_counter() - start) * 1000)
+            fresh_settled.append(stats.get("settled", 0))
+
+            start = time.perf_counter()
+            result = session.route(source, dest, metric)
+            ms = (time.perf_counter() - start) * 1000
+            # The first move of a drag builds the tree, the rest reuse it
+            (first_ms if i == 0 else tree_ms).append(ms)
+            if i:
+                tree_settled.append(result["session"]["settled"])
+
+            if (fresh is None) != ("error" in result) or (
+                    fresh is not None and route_cost(fresh, metric) != route_cost(result, metric)):
+                mismatches += 1
+
+    fresh_ms, tree_ms = np.array(fresh_ms), np.array(tree_ms)
+    print(f"{'':<14} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'settled/move':>13}")
+    print(f"{'fresh search':<14} {np.percentile(fresh_ms, 50):>8.2f} {np.percentile(fresh_ms, 95):>8.2f} "
+          f"{fresh_ms.max():>8.2f} {np.mean(fresh_settled):>13,.0f}")
+    print(f"{'session tree':<14} {np.percentile(tree_ms, 50):>8.2f} {np.percentile(tree_ms, 95):>8.2f} "
+          f"{tree_ms.max():>8.2f} {np.mean(tree_settled):>13,.0f}")
+    print(f"first move of a drag (tree built): {np.mean(first_ms):.2f} ms, "
+          f"p50 speedup {np.percentile(fresh_ms, 50) / np.percentile(tree_ms, 50):.1f}x"
+          + (f", {mismatches} routes differ in cost" if mismatches else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=200, help="Synthetic grid side, size^2 nodes")
+    parser.add_argument("--drags", type=int, default=5, help="Sources, each with its own dragged destination")
+    parser.add_argument("--moves", type=int, default=50, help="Destination moves per drag")
+    parser.add_argument("--step-m", type=float, default=150, help="Distance the destination moves per step")
+    args = parser.parse_args()
+
+    varazdin = load_raw_export(RAW_EXPORT)
+    bench_region("Varaždin export", varazdin, args, "distance")
+    grid = grid_road_graph(args.size)
+    bench_region("synthetic grid", grid, args, "distance")
+    bench_region("synthetic grid", grid, args, "time")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Payload size and serialization time of RouteResponse for each geometry mode.
+
+Run from the Software directory:
+    python -m backend.benchmarks.route_payload
+"""
+import math
+import random
+import time
+
+import orjson
+
+from backend.api.endpoints.routing import build_route_response, route_to_dict
+from backend.models.route import RouteRequest
+
+ROUTE_SIZES = {"short": 150, "long": 15000}
+REPEATS = 20
+
+MODES = {
+    "full": {},
+    "full, no path": {"include_path": False},
+    "polyline p5": {"geometry": "polyline", "precision": 5},
+    "polyline p6": {"geometry": "polyline", "precision": 6},
+    "polyline p5, z12, no path": {"geometry": "polyline", "zoom": 12, "include_path": False},
+}
+
+
+def synthetic_result(n_nodes: int, seed: int = 42) -> dict:
+    """Road-like route starting in Varaždin: ~60 m steps with a slowly drifting heading."""
+    rng = random.Random(seed)
+    lat, lon, heading = 46.3057, 16.3366, rng.uniform(0, 2 * math.pi)
+    waypoints, path = [], []
+    for i in range(n_nodes):
+        waypoints.append([lat, lon])
+        path.append(200000000 + i * 7919)
+        heading += rng.gauss(0, 0.15)
+        lat += 0.00054 * math.cos(heading)
+        lon += 0.00078 * math.sin(heading)
+
+    distance_km = n_nodes * 0.06
+    return {
+        "path": path,
+        "distance_km": distance_km,
+        "ideal_time_min": distance_km,
+        "realistic_time_min": distance_km * 1.3,
+        "average_speed_kmh": 60 / 1.3,
+        "waypoints": waypoints,
+    }
+
+
+def main():
+    print(f"{'route':<7} {'mode':<28} {'points':>7} {'bytes':>10} {'ms/response':>12}")
+    for label, n_nodes in ROUTE_SIZES.items():
+        result = synthetic_result(n_nodes)
+        for mode, options in MODES.items():
+            request = RouteRequest(source_coords=[0, 0], dest_coords=[0, 0], **options)
+
+            start = time.perf_counter()
+            for _ in range(REPEATS):
+                response = build_route_response(result, request, "optimal")
+                body = orjson.dumps(route_to_dict(response))
+            elapsed_ms = (time.perf_counter() - start) * 1000 / REPEATS
+
+            points = len(response.waypoints) if response.waypoints else "-"
+            print(f"{label:<7} {mode:<28} {points:>7} {len(body):>10,} {elapsed_ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
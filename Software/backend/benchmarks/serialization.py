@@ -0,0 +1,72 @@
+"""
+Serialization cost per response size for the routing endpoints.
+
+Compares the default FastAPI path (validate RouteResponse, jsonable_encoder,
+json.dumps) with the fast path used by the endpoints (model_construct +
+orjson), and reports gzip/brotli compression on top of it.
+
+Run from the Software directory:
+    python -m backend.benchmarks.serialization
+"""
+import json
+import time
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+from backend.api.compression import CompressionMiddleware, brotli
+from backend.api.endpoints.routing import build_route_response, route_to_dict
+from backend.benchmarks.route_payload import synthetic_result
+from backend.models.route import RouteRequest, RouteResponse
+
+WAYPOINT_COUNTS = [100, 1000, 10000]
+N_ALTERNATIVES = 3
+REPEATS = 10
+
+
+def timed(func) -> tuple:
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        output = func()
+    return output, (time.perf_counter() - start) * 1000 / REPEATS
+
+
+def main():
+    request = RouteRequest(source_coords=[0, 0], dest_coords=[0, 0])
+    compressor = CompressionMiddleware(app=None)
+    encodings = ["gzip", "br"] if brotli is not None else ["gzip"]
+
+    header = f"{'waypoints':>9} {'bytes':>11} {'default ms':>11} {'fast ms':>8}"
+    for encoding in encodings:
+        header += f" {encoding + ' bytes':>11} {encoding + ' ms':>8}"
+    print(f"/alternative with {N_ALTERNATIVES} routes per response")
+    print(header)
+
+    for n_waypoints in WAYPOINT_COUNTS:
+        results = [synthetic_result(n_waypoints, seed=i) for i in range(N_ALTERNATIVES)]
+
+        def default_path():
+            routes = [
+                RouteResponse(index=i + 1, type="alternative", **{k: r[k] for k in RouteResponse.model_fields if k in r})
+                for i, r in enumerate(results)
+            ]
+            return json.dumps(jsonable_encoder({"alternatives": routes})).encode()
+
+        def fast_path():
+            return orjson.dumps({"alternatives": [
+                route_to_dict(build_route_response(r, request, "alternative", index=i + 1))
+                for i, r in enumerate(results)
+            ]})
+
+        _, default_ms = timed(default_path)
+        body, fast_ms = timed(fast_path)
+
+        line = f"{n_waypoints:>9,} {len(body):>11,} {default_ms:>11.2f} {fast_ms:>8.2f}"
+        for encoding in encodings:
+            compressed, compress_ms = timed(lambda: compressor.compress(body, encoding))
+            line += f" {len(compressed):>11,} {compress_ms:>8.2f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
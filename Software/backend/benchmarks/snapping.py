@@ -0,0 +1,79 @@
+"""
+Edge snapping (STR-tree) vs the k nearest node vectors in Qdrant.
+
+Accuracy is the distance from the query point to where it was snapped:
+the projected point on the nearest edge, or the closest of the k nodes.
+
+Run from the Software directory:
+    python -m backend.benchmarks.snapping [--graphml FILE] [--queries 1000]
+"""
+import argparse
+import math
+import random
+import time
+
+import numpy as np
+import osmnx as ox
+
+from backend.core.osm_data_loader import load_raw_export
+from backend.core.region_registry import graph_bbox
+from backend.core.vector_db import VectorDatabase
+
+RAW_EXPORT = "../Documentation/Varaždin Highway RAW data - generic format.json"
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * 6371008.8 * math.asin(math.sqrt(a))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--graphml", help="GraphML snapshot instead of the Varaždin raw export")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=3)
+    args = parser.parse_args()
+
+    graph = ox.load_graphml(args.graphml) if args.graphml else load_raw_export(RAW_EXPORT)
+    db = VectorDatabase(vector_size=64)
+    db.create_embeddings(graph)
+
+    west, south, east, north = graph_bbox(graph)
+    rng = random.Random(0)
+    queries = [[rng.uniform(south, north), rng.uniform(west, east)] for _ in range(args.queries)]
+
+    start = time.perf_counter()
+    node_hits = [db._nearest_nodes(q, limit=args.k) for q in queries]
+    node_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    node_dist = np.array([
+        min(haversine_m(lat, lon, hit.payload["lat"], hit.payload["lon"]) for hit in hits)
+        for (lat, lon), hits in zip(queries, node_hits)
+    ])
+
+    start = time.perf_counter()
+    for q in queries:
+        db.edge_index.snap(*q)
+    single_ms = (time.perf_counter() - start) * 1000 / len(queries)
+
+    start = time.perf_counter()
+    snaps = db.edge_index.snap_many(queries)
+    batch_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    edge_dist = np.array([
+        haversine_m(lat, lon, snap["lat"], snap["lon"]) for (lat, lon), snap in zip(queries, snaps)
+    ])
+
+    print(f"{graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges, {len(queries)} queries")
+    print(f"{'method':<26} {'ms/query':>9} {'mean m':>8} {'p95 m':>8}")
+    for label, ms, dist in [
+        (f"qdrant k={args.k} nodes", node_ms, node_dist),
+        ("edge index, single", single_ms, edge_dist),
+        ("edge index, batched", batch_ms, edge_dist),
+    ]:
+        print(f"{label:<26} {ms:>9.3f} {dist.mean():>8.1f} {np.percentile(dist, 95):>8.1f}")
+    print(f"edge snap closer than nearest of k nodes: {np.mean(edge_dist < node_dist - 1):.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Cold-start cost of the API.
+
+Imports backend.main in fresh interpreters and reports the import time,
+which of the heavy dependencies came with it (osmnx, Qdrant's client, the
+plotting and geocoding libraries should only load when a region is built
+or a map drawn) and the packages taking longest to import
+from python -X importtime. Then starts uvicorn and times the first 200
+from /health/live and, with --ready, from /health/ready once warm-up is done.
+
+Run from the Software directory:
+    python -m backend.benchmarks.startup [--repeats 5] [--top 12] [--port 8765] [--ready]
+"""
+import argparse
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+import httpx
+import numpy as np
+
+# Dependencies that should stay out of `import backend.main`
+DEFERRED_MODULES = [
+    "osmnx", "qdrant_client", "folium", "matplotlib", "pyvis", "plotly", "geopy", "pandas", "geopandas",
+]
+
+IMPORT_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import backend.main
+print((time.perf_counter() - start) * 1000, ",".join(m for m in {modules!r} if m in sys.modules))
+"""
+
+
+def measure_import(repeats: int):
+    times, loaded = [], set()
+    script = IMPORT_SCRIPT.format(modules=DEFERRED_MODULES)
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True).stdout
+        ms, _, modules = out.strip().splitlines()[-1].partition(" ")
+        times.append(float(ms))
+        loaded.update(filter(None, modules.split(",")))
+    return np.array(times), sorted(loaded)
+
+
+def import_profile(top: int):
+    """Import ms per top-level package from -X importtime, summing each module's own (self) time."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import backend.main"],
+                            capture_output=True, text=True, check=True)
+    packages = defaultdict(float)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        if own.strip().isdigit():
+            packages[name.strip().split(".")[0]] += int(own) / 1000
+    return sorted(packages.items(), key=lambda item: -item[1])[:top]
+
+
+def measure_server(port: int, wait_ready: bool, timeout: float = 600):
+    """Seconds from spawning uvicorn to the first 200 from /health/live (and /health/ready)."""
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    timings = {}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5) as client:
+            for path in ["/health/live"] + (["/health/ready"] if wait_ready else []):
+                while time.perf_counter() - start < timeout:
+                    if server.poll() is not None:
+                        raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+                    try:
+                        if client.get(path).status_code == 200:
+                            timings[path] = time.perf_counter() - start
+                            break
+                    except httpx.TransportError:
+                        pass
+                    time.sleep(0.02)
+                else:
+                    raise TimeoutError(f"{path} not up after {timeout} s")
+    finally:
+        server.terminate()
+        server.wait()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=5, help="Fresh interpreters to time the import in")
+    parser.add_argument("--top", type=int, default=12, help="Packages to list from -X importtime")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ready", action="store_true", help="Also wait for /health/ready (region warm-up)")
+    args = parser.parse_args()
+
+    times, loaded = measure_import(args.repeats)
+    print(f"import backend.main over {args.repeats} runs: median {np.median(times):.0f} ms, "
+          f"min {times.min():.0f} ms, max {times.max():.0f} ms")
+    print(f"deferred modules loaded at import: {', '.join(loaded) if loaded else 'none'}")
+
+    print(f"\n{'package':<24} {'import ms':>10}")
+    for package, ms in import_profile(args.top):
+        print(f"{package:<24} {ms:>10.1f}")
+
+    print()
+    for path, seconds in measure_server(args.port, args.ready).items():
+        print(f"first 200 from {path}: {seconds:.2f} s after spawning uvicorn")
+
+
+if __name__ == "__main__":
+    main()
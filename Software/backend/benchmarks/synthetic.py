@@ -0,0 +1,59 @@
+"""Synthetic road graphs for benchmarks that need regions larger than the offline export."""
+import math
+import random
+
+import networkx as nx
+import osmnx as ox
+from shapely.geometry import LineString
+
+ROAD_TYPES = ["residential"] * 6 + ["tertiary"] * 2 + ["secondary", "primary"]
+
+
+def grid_road_graph(size: int, spacing_m: float = 150, origin=(46.3057, 16.3366), seed: int = 0,
+                    osm_tags: bool = False) -> nx.MultiDiGraph:
+    """
+    size x size two-way street grid shaped like an osmnx graph (x/y nodes, length/highway edges).
+
+    Every 10th row and column is a primary road, the rest get random lower
+    classes, and 5% of blocks are missing so shortest paths are not trivial.
+    With osm_tags, nodes and edges also carry the tags and geometries an
+    osmnx download would keep under ox.settings, for memory benchmarks.
+    """
+    rng = random.Random(seed)
+    lat0, lon0 = origin
+    dlat = spacing_m / 111320
+    dlon = spacing_m / (111320 * math.cos(math.radians(lat0)))
+
+    G = nx.MultiDiGraph(crs="epsg:4326")
+    way_id = 0
+    for row in range(size):
+        for col in range(size):
+            G.add_node(row * size + col, y=lat0 + row * dlat, x=lon0 + col * dlon)
+            if osm_tags:
+                G.nodes[row * size + col].update(street_count=4, highway=None if col % 7 else "traffic_signals")
+
+    for row in range(size):
+        for col in range(size):
+            node = row * size + col
+            for neighbor, line in ((node + 1, row), (node + size, col)):
+                if (neighbor == node + 1 and col == size - 1) or neighbor >= size * size:
+                    continue
+                if rng.random() < 0.05:
+                    continue
+                highway = "primary" if line % 10 == 0 else rng.choice(ROAD_TYPES)
+                length = spacing_m * rng.uniform(1.0, 1.15)
+                for u, v in ((node, neighbor), (neighbor, node)):
+                    tags = {}
+                    if osm_tags:
+                        ux, uy, vx, vy = G.nodes[u]["x"], G.nodes[u]["y"], G.nodes[v]["x"], G.nodes[v]["y"]
+                        way_tags = {"name": f"{highway.title()} Street {line}", "lanes": "2", "maxspeed": "50",
+                                    "ref": f"R{line}", "surface": "asphalt"}
+                        tags = {tag: value for tag, value in way_tags.items() if tag in ox.settings.useful_tags_way}
+                        tags.update(
+                            oneway=False,
+                            reversed=u > v,
+                            geometry=LineString([(ux, uy), ((ux + vx) / 2, (uy + vy) / 2), (vx, vy)]),
+                        )
+                    G.add_edge(u, v, length=length, highway=highway, osmid=way_id, **tags)
+                way_id += 1
+    return G
@@ -0,0 +1,64 @@
+"""
+Cold-start download time of tiled fetching by worker count, against the stand-in Overpass.
+
+Each response is delayed by --latency seconds to mimic a remote server,
+so wall time should drop roughly in proportion to the number of workers
+until it is bounded by the tile count. osmnx also spends ~0.3 s of
+GIL-bound CPU per tile (mostly UTM CRS estimation), which caps the speedup
+when tiles are tiny or responses fast. The merged graph is compared with
+a single-request download to check that tile borders are de-duplicated.
+
+Run from the Software directory:
+    python -m backend.benchmarks.tiled_fetch [--tile-km 1] [--latency 2.0]
+"""
+import argparse
+import time
+
+import osmnx as ox
+
+from backend.benchmarks.overpass_standin import StandInOverpass
+from backend.core.osm_data_loader import download_polygon_graph, split_into_tiles
+from shapely.geometry import box
+
+WORKERS = [1, 2, 4, 8]
+
+
+def summary(G) -> tuple:
+    return G.number_of_nodes(), G.number_of_edges(), round(sum(d["length"] for _, _, d in G.edges(data=True)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tile-km", type=float, default=1.0)
+    parser.add_argument("--latency", type=float, default=2.0)
+    args = parser.parse_args()
+
+    standin = StandInOverpass(latency_s=args.latency).start()
+    ox.settings.overpass_url = standin.url
+    ox.settings.overpass_rate_limit = False
+    ox.settings.use_cache = False
+    ox.settings.log_console = False
+
+    area = box(16.300, 46.290, 16.370, 46.330)
+    tiles = split_into_tiles(area, args.tile_km)
+
+    start = time.perf_counter()
+    reference = summary(download_polygon_graph(area, tile_km=None))
+    single_s = time.perf_counter() - start
+    print(f"{len(tiles)} tiles of {args.tile_km} km, {args.latency}s latency per request")
+    print(f"{'workers':>7} {'wall s':>7} {'speedup':>8} {'nodes/edges/length m':>26} {'matches single':>15}")
+    print(f"{'single':>7} {single_s:>7.2f} {'':>8} {str(reference):>26}")
+
+    baseline = None
+    for workers in WORKERS:
+        start = time.perf_counter()
+        result = summary(download_polygon_graph(area, tile_km=args.tile_km, max_workers=workers))
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{workers:>7} {elapsed:>7.2f} {baseline / elapsed:>7.1f}x {str(result):>26} {str(result == reference):>15}")
+
+    standin.stop()
+
+
+if __name__ == "__main__":
+    main()
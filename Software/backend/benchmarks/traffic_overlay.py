@@ -0,0 +1,90 @@
+"""
+Live traffic update throughput on the weight overlay, and route latency under it.
+
+Batches of random speed/closure updates are applied to a large synthetic
+region, both as (u, v) update dicts (the API path) and as pre-resolved
+overlay positions. "full rebuild" recomputes every edge cost, the cost of
+re-weighting the whole region per batch.
+
+Run from the Software directory:
+    python -m backend.benchmarks.traffic_overlay [--size 300]
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from backend.benchmarks.synthetic import grid_road_graph
+from backend.core.edge_index import EdgeIndex
+from backend.core.vector_db import REALISTIC_FACTOR, SPEED_LIMITS, VectorDatabase
+from backend.core.weight_overlay import WeightOverlay
+
+BATCH_SIZES = [1_000, 100_000]
+REPEATS = 5
+
+
+def timed_ms(fn, repeats=REPEATS):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=300, help="Grid side, size^2 nodes")
+    args = parser.parse_args()
+
+    graph = grid_road_graph(args.size)
+    start = time.perf_counter()
+    overlay = WeightOverlay(graph, SPEED_LIMITS, REALISTIC_FACTOR)
+    build_ms = (time.perf_counter() - start) * 1000
+    edges = list(graph.edges(keys=True))
+    edge_count = len(edges)
+    print(f"{graph.number_of_nodes():,} nodes, {edge_count:,} edges, overlay built in {build_ms:.0f} ms")
+
+    rng = random.Random(0)
+    all_eids = np.arange(edge_count)
+    full_ms = timed_ms(lambda: overlay._recompute(all_eids))
+
+    print(f"{'batch':>8} {'dicts ms':>9} {'dicts upd/s':>12} {'arrays ms':>10} {'arrays upd/s':>13} {'full rebuild ms':>16}")
+    for batch in BATCH_SIZES:
+        picked = rng.sample(edges, batch)
+        updates = [
+            {"u": u, "v": v, "key": key, "speed_kmh": rng.uniform(5, 90), "closed": rng.random() < 0.01}
+            for u, v, key in picked
+        ]
+        eids = np.array([overlay.resolve(u, v, key)[0] for u, v, key in picked])
+        speeds = np.array([update["speed_kmh"] for update in updates])
+        closures = np.array([int(update["closed"]) for update in updates])
+
+        dict_ms = timed_ms(lambda: overlay.apply_updates(updates))
+        array_ms = timed_ms(lambda: overlay.apply_arrays(eids, speeds, closures))
+        print(f"{batch:>8,} {dict_ms:>9.2f} {batch / dict_ms * 1000:>12,.0f} "
+              f"{array_ms:>10.2f} {batch / array_ms * 1000:>13,.0f} {full_ms:>16.2f}")
+
+    # Routes read the overlay directly, so the next query already sees the updates
+    db = VectorDatabase(vector_size=64)
+    db.graph = graph
+    db.edge_index = EdgeIndex(graph)
+    db.overlay = overlay
+    corner = graph.nodes[args.size + 1]
+    far = graph.nodes[(args.size - 2) * args.size + args.size - 2]
+    source, dest = [corner["y"], corner["x"]], [far["y"], far["x"]]
+
+    print(f"{'route search':<28} {'ms':>8} {'path nodes':>11}")
+    for label, reset in (("speed limits", True), ("after live updates", False)):
+        if reset:
+            overlay.reset()
+        else:
+            overlay.apply_updates(updates)
+        for metric in ("distance", "time"):
+            start = time.perf_counter()
+            path, _, _ = db._route_from_edge_snaps(source, dest, metric)
+            ms = (time.perf_counter() - start) * 1000
+            print(f"{label + ', ' + metric:<28} {ms:>8.1f} {len(path):>11,}")
+
+
+if __name__ == "__main__":
+    main()
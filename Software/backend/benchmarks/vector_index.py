@@ -0,0 +1,81 @@
+"""
+Build time, memory and recall@k of the Qdrant node index per configuration.
+
+Recall is measured against exact (brute force) search on the same
+collection. Local Qdrant (":memory:" or a path) always scans exactly, so
+HNSW and quantization settings only change results against a server:
+    python -m backend.benchmarks.vector_index --url http://localhost:6333
+
+Run from the Software directory:
+    python -m backend.benchmarks.vector_index [--graphml FILE] [--k 10]
+"""
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+
+import osmnx as ox
+
+from backend.benchmark import process_memory_mb
+from backend.core.osm_data_loader import load_raw_export
+from backend.core.region_registry import graph_bbox
+from backend.core.vector_db import VectorDatabase
+
+RAW_EXPORT = "../Documentation/Varaždin Highway RAW data - generic format.json"
+
+CONFIGS = {
+    "memory": {},
+    "on-disk local": {"storage": True},
+    "hnsw m=8 ef=64": {"hnsw": {"m": 8, "ef_construct": 64}, "hnsw_ef": 32},
+    "hnsw m=32 ef=200": {"hnsw": {"m": 32, "ef_construct": 200}, "hnsw_ef": 128},
+    "scalar int8": {"quantization": "scalar"},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--graphml", help="GraphML snapshot to index instead of the Varaždin raw export")
+    parser.add_argument("--url", help="Qdrant server URL")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    graph = ox.load_graphml(args.graphml) if args.graphml else load_raw_export(RAW_EXPORT)
+    west, south, east, north = graph_bbox(graph)
+    rng = random.Random(0)
+    queries = [(rng.uniform(south, north), rng.uniform(west, east)) for _ in range(args.queries)]
+    print(f"{graph.number_of_nodes()} nodes, {graph.number_of_edges()} edges, {args.queries} queries, k={args.k}")
+    print(f"{'config':<18} {'build s':>8} {'py peak MB':>10} {'rss MB':>7} {'query ms':>9} {'recall@k':>9}")
+
+    for i, (label, config) in enumerate(CONFIGS.items()):
+        config = dict(config)
+        with tempfile.TemporaryDirectory() as storage_dir:
+            storage_path = storage_dir if config.pop("storage", False) else None
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            db = VectorDatabase(vector_size=64, storage_path=storage_path, url=args.url,
+                                collection_prefix=f"bench_{i}", **config)
+            db.create_embeddings(graph)
+            build_s = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            start = time.perf_counter()
+            approx = [[p.id for p in db._nearest_nodes(q, limit=args.k)] for q in queries]
+            query_ms = (time.perf_counter() - start) * 1000 / len(queries)
+            exact = [[p.id for p in db._nearest_nodes(q, limit=args.k, exact=True)] for q in queries]
+            recall = sum(len(set(a) & set(e)) for a, e in zip(approx, exact)) / (args.k * len(queries))
+
+            if args.url:
+                db.client.delete_collection(db.node_collection)
+                db.client.delete_collection(db.edge_collection)
+            db.close()
+
+        rss = process_memory_mb()["rss_mb"]
+        print(f"{label:<18} {build_s:>8.2f} {peak / 2**20:>10.1f} {rss:>7} {query_ms:>9.2f} {recall:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import math
+from typing import Dict, List, Optional, Sequence
+
+import networkx as nx
+import numpy as np
+import shapely
+from shapely.geometry import LineString
+
+from backend.core.geometry import EARTH_RADIUS_M
+from backend.core.search import Weight, weight_function
+
+
+class EdgeIndex:
+    """
+    STR-tree over road edge geometries for snapping points onto the nearest segment.
+
+    Geometries are projected to a local equirectangular plane in meters around
+    the graph center, so nearest distances and positions along the edge come
+    straight from shapely. Both directions of a two-way road are indexed.
+    """
+
+    def __init__(self, graph: nx.MultiDiGraph):
+        self.graph = graph
+        ys = [data["y"] for _, data in graph.nodes(data=True)]
+        self.lat0 = math.radians((min(ys) + max(ys)) / 2)
+        self.kx = EARTH_RADIUS_M * math.cos(self.lat0) * math.pi / 180
+        self.ky = EARTH_RADIUS_M * math.pi / 180
+
+        self.edges = []
+        geometries = []
+        for u, v, key, data in graph.edges(keys=True, data=True):
+            if "geometry" in data:
+                lon_lat = np.asarray(data["geometry"].coords)
+            else:
+                lon_lat = np.array([
+                    [graph.nodes[u]["x"], graph.nodes[u]["y"]],
+                    [graph.nodes[v]["x"], graph.nodes[v]["y"]],
+                ])
+            geometries.append(LineString(lon_lat * [self.kx, self.ky]))
+            self.edges.append((u, v, key))
+
+        self.geometries = np.array(geometries, dtype=object)
+        self.tree = shapely.STRtree(self.geometries)
+
+    def snap_many(self, coords: Sequence[Sequence[float]], weight: Optional[Weight] = None) -> List[Dict]:
+        """
+        Snap [lat, lon] points to their nearest edge in one vectorized query.
+
+        Args:
+            coords: [lat, lon] points
+            weight: When given, roads closed in both directions under it are
+                skipped for the nearest one that can be driven
+
+        Returns:
+            One dict per point with the edge (u, v, key), the fraction along it
+            measured from u, the snapped lat/lon and the snapping distance in meters
+        """
+        coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        points = shapely.points(coords[:, 1] * self.kx, coords[:, 0] * self.ky)
+        (point_idx, edge_idx), distances = self.tree.query_nearest(
+            points, return_distance=True, all_matches=False
+        )
+
+        order = np.argsort(point_idx)
+        edge_idx, distances = edge_idx[order], distances[order]
+        results = [self._snap_result(point, edge, distance)
+                   for point, edge, distance in zip(points, edge_idx, distances)]
+        if weight is not None:
+            results = [
+                snap if self.is_open(snap, weight) else self._snap_open(point, snap, weight)
+                for point, snap in zip(points, results)
+            ]
+        return results
+
+    def snap(self, lat: float, lon: float, weight: Optional[Weight] = None) -> Dict:
+        return self.snap_many([[lat, lon]], weight=weight)[0]
+
+    def _snap_result(self, point, edge: int, distance: float) -> Dict:
+        u, v, key = self.edges[edge]
+        line = self.geometries[edge]
+        fraction = shapely.line_locate_point(line, point, normalized=True)
+        snapped = shapely.line_interpolate_point(line, fraction, normalized=True)
+        return {
+            "u": u,
+            "v": v,
+            "key": key,
+            "fraction": float(fraction),
+            "lat": float(shapely.get_y(snapped) / self.ky),
+            "lon": float(shapely.get_x(snapped) / self.kx),
+            "distance_m": float(distance),
+        }
+
+    def _snap_open(self, point, closed_snap: Dict, weight: Weight, max_rounds: int = 6) -> Dict:
+        """Nearest edge that is open in some direction, searching ever wider circles around point."""
+        radius = max(closed_snap["distance_m"], 1) * 2
+        for _ in range(max_rounds):
+            candidates = self.tree.query(point, predicate="dwithin", distance=radius)
+            distances = shapely.distance(self.geometries[candidates], point)
+            for i in np.argsort(distances):
+                snap = self._snap_result(point, candidates[i], distances[i])
+                if self.is_open(snap, weight):
+                    return snap
+            radius *= 4
+        # Everything nearby is closed, the search reports there is no path
+        return closed_snap
+
+    def _direction_cost(self, u, v, weight: Weight, key=None) -> float:
+        """Cost of driving u -> v: along edge key, or the cheapest open parallel edge when key is None."""
+        edges = self.graph[u][v] if key is None else {key: self.graph[u][v][key]}
+        cost = weight_function(self.graph, weight)(u, v, edges)
+        return float("inf") if cost is None else cost
+
+    def _edge_costs(self, snap: Dict, weight: Weight):
+        """(forward, backward) cost of the snapped road, backward over its cheapest open v -> u edge."""
+        u, v = snap["u"], snap["v"]
+        forward = self._direction_cost(u, v, weight, key=snap["key"])
+        backward = self._direction_cost(v, u, weight) if self.graph.has_edge(v, u) else float("inf")
+        return forward, backward
+
+    def is_open(self, snap: Dict, weight: Weight) -> bool:
+        return min(self._edge_costs(snap, weight)) < float("inf")
+
+    def source_offsets(self, snap: Dict, weight: Weight = "length") -> Dict:
+        """Start costs of the nodes reachable from a snapped position, for dijkstra_with_offsets."""
+        u, v = snap["u"], snap["v"]
+        forward, backward = self._edge_costs(snap, weight)
+        offsets = {}
+        if forward < float("inf"):
+            offsets[v] = (1 - snap["fraction"]) * forward
+        if backward < float("inf"):
+            offsets[u] = min(offsets.get(u, float("inf")), snap["fraction"] * backward)
+        return offsets
+
+    def target_offsets(self, snap: Dict, weight: Weight = "length") -> Dict:
+        """End costs of the nodes a snapped position can be reached from, for dijkstra_with_offsets."""
+        u, v = snap["u"], snap["v"]
+        forward, backward = self._edge_costs(snap, weight)
+        offsets = {}
+        if forward < float("inf"):
+            offsets[u] = snap["fraction"] * forward
+        if backward < float("inf"):
+            offsets[v] = min(offsets.get(v, float("inf")), (1 - snap["fraction"]) * backward)
+        return offsets
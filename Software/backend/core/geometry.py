@@ -0,0 +1,152 @@
+import math
+from typing import List, Sequence
+
+import numpy as np
+import shapely
+
+# Web Mercator ground resolution at zoom 0 on the equator (meters per pixel)
+METERS_PER_PIXEL_Z0 = 156543.03392
+EARTH_RADIUS_M = 6371008.8
+
+
+def encode_polyline(points: Sequence[Sequence[float]], precision: int = 5) -> str:
+    """
+    Encode [lat, lon] pairs with the Google encoded polyline algorithm.
+
+    Args:
+        points: Sequence of [lat, lon] pairs
+        precision: Number of decimal places kept (5 = ~1 m, 6 = ~0.1 m)
+
+    Returns:
+        Encoded polyline string
+    """
+    factor = 10 ** precision
+    output = []
+    prev_lat = prev_lon = 0
+
+    for lat, lon in points:
+        lat_i = int(round(lat * factor))
+        lon_i = int(round(lon * factor))
+        for delta in (lat_i - prev_lat, lon_i - prev_lon):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                output.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            output.append(chr(value + 63))
+        prev_lat, prev_lon = lat_i, lon_i
+
+    return "".join(output)
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> List[List[float]]:
+    """Inverse of encode_polyline, returns a list of [lat, lon] pairs."""
+    factor = 10 ** precision
+    points = []
+    index = lat = lon = 0
+
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        points.append([lat / factor, lon / factor])
+
+    return points
+
+
+def zoom_to_tolerance_m(zoom: int, lat: float) -> float:
+    """Ground size of one screen pixel at the given web map zoom level and latitude."""
+    return METERS_PER_PIXEL_Z0 * math.cos(math.radians(lat)) / (2 ** zoom)
+
+
+def simplify_douglas_peucker(points: Sequence[Sequence[float]], tolerance_m: float) -> List[List[float]]:
+    """
+    Douglas-Peucker simplification of [lat, lon] pairs.
+
+    Distances are measured on a local equirectangular projection, which is
+    accurate enough at route scale. First and last points are always kept.
+    """
+    n = len(points)
+    if n <= 2 or tolerance_m <= 0:
+        return [list(p) for p in points]
+
+    coords = np.asarray(points, dtype=float)
+    lat0 = math.radians(coords[:, 0].mean())
+    x = coords[:, 1] * (EARTH_RADIUS_M * math.cos(lat0) * math.pi / 180)
+    y = coords[:, 0] * (EARTH_RADIUS_M * math.pi / 180)
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    tol_sq = tolerance_m * tolerance_m
+    stack = [(0, n - 1)]
+
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        ax, ay = x[first], y[first]
+        dx, dy = x[last] - ax, y[last] - ay
+        px = x[first + 1:last] - ax
+        py = y[first + 1:last] - ay
+
+        seg_len_sq = dx * dx + dy * dy
+        if seg_len_sq == 0:
+            dist_sq = px * px + py * py
+        else:
+            t = np.clip((px * dx + py * dy) / seg_len_sq, 0.0, 1.0)
+            dist_sq = (px - t * dx) ** 2 + (py - t * dy) ** 2
+
+        i = int(np.argmax(dist_sq))
+        if dist_sq[i] > tol_sq:
+            max_index = first + 1 + i
+            keep[max_index] = True
+            stack.append((first, max_index))
+            stack.append((max_index, last))
+
+    return [list(points[i]) for i in np.flatnonzero(keep)]
+
+
+def simplify_for_zoom(points: Sequence[Sequence[float]], zoom: int) -> List[List[float]]:
+    """Drop waypoints that would not be visible at the given map zoom level."""
+    if len(points) <= 2:
+        return [list(p) for p in points]
+    mid_lat = points[len(points) // 2][0]
+    return simplify_douglas_peucker(points, zoom_to_tolerance_m(zoom, mid_lat))
+
+
+def reachability_polygon(lons: Sequence[float], lats: Sequence[float], ratio: float = 0.3, grid: int = 200):
+    """
+    Concave hull around reached node positions.
+
+    Points are first bucketed into a grid x grid occupancy raster and only
+    one point per cell on the edge of the occupied area is kept, so the hull
+    is computed over a few thousand points instead of every reached node.
+    """
+    lons = np.asarray(lons, dtype=float)
+    lats = np.asarray(lats, dtype=float)
+    if len(lons) < 3:
+        return shapely.multipoints(np.column_stack([lons, lats])).convex_hull
+
+    west, south = lons.min(), lats.min()
+    cell = max(lons.max() - west, lats.max() - south) / grid or 1.0
+    col = ((lons - west) / cell).astype(int)
+    row = ((lats - south) / cell).astype(int)
+
+    occupied = np.zeros((row.max() + 3, col.max() + 3), dtype=bool)
+    occupied[row + 1, col + 1] = True
+    interior = (occupied[1:-1, 1:-1] & occupied[:-2, 1:-1] & occupied[2:, 1:-1]
+                & occupied[1:-1, :-2] & occupied[1:-1, 2:])
+    on_edge = ~interior[row, col]
+
+    _, first = np.unique(row[on_edge] * (col.max() + 1) + col[on_edge], return_index=True)
+    points = np.column_stack([lons[on_edge][first], lats[on_edge][first]])
+    return shapely.concave_hull(shapely.multipoints(points), ratio=ratio)
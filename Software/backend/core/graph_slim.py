@@ -0,0 +1,129 @@
+import hashlib
+import sys
+import threading
+from typing import Any, Dict, List
+
+import networkx as nx
+import numpy as np
+import shapely
+
+# Slimmed edges store the road type as an index into HIGHWAY_NAMES under this attribute
+HIGHWAY_ATTR = "hw"
+
+HIGHWAY_NAMES: List[str] = []
+HIGHWAY_CODES: Dict[str, int] = {}
+# Regions are slimmed concurrently (warm-up, requests, prefetch), new names must get distinct codes
+_highway_lock = threading.Lock()
+
+NODE_ATTRS = ("x", "y")
+
+
+def highway_code(name: str) -> int:
+    """Small integer code for a road type, shared by every region."""
+    code = HIGHWAY_CODES.get(name)
+    if code is None:
+        with _highway_lock:
+            code = HIGHWAY_CODES.get(name)
+            if code is None:
+                # Appended before the code is published, so road_type() can always look it up
+                HIGHWAY_NAMES.append(name)
+                code = HIGHWAY_CODES[name] = len(HIGHWAY_NAMES) - 1
+    return code
+
+
+def road_type(data: Dict[str, Any], default: str = "unclassified") -> str:
+    """Road type of an edge, from its code on slimmed graphs or its first OSM highway tag."""
+    code = data.get(HIGHWAY_ATTR)
+    if code is not None:
+        return HIGHWAY_NAMES[code]
+    value = data.get("highway", default)
+    return value[0] if isinstance(value, list) else value
+
+
+def slim_graph(graph: nx.MultiDiGraph, keep_geometry: bool = False) -> Dict[str, int]:
+    """
+    Strip a road graph in place down to what routing reads.
+
+    Nodes keep x/y, edges keep length and their road type as a code (see
+    highway_code); OSM ids, names, lanes and the rest of the tags are
+    dropped. Edge geometries are dropped unless keep_geometry, so the
+    EdgeIndex has to be built in between. Dicts are cleared rather than
+    replaced so the peak stays at one copy of the graph.
+
+    Returns:
+        Number of node and edge attributes removed
+    """
+    removed_node_attrs = 0
+    for _, data in graph.nodes(data=True):
+        kept = {attr: data[attr] for attr in NODE_ATTRS if attr in data}
+        removed_node_attrs += len(data) - len(kept)
+        data.clear()
+        data.update(kept)
+
+    removed_edge_attrs = 0
+    for _, _, data in graph.edges(data=True):
+        kept = {"length": float(data.get("length", 0)), HIGHWAY_ATTR: highway_code(road_type(data))}
+        if keep_geometry and "geometry" in data:
+            kept["geometry"] = data["geometry"]
+        removed_edge_attrs += len(data) - len(kept)
+        data.clear()
+        data.update(kept)
+
+    return {"removed_node_attrs": removed_node_attrs, "removed_edge_attrs": removed_edge_attrs}
+
+
+def deep_sizeof(obj: Any) -> int:
+    """
+    Bytes held by an object and everything reachable through dicts, lists, tuples and sets.
+
+    Shared objects are counted once. Shapely geometries count their
+    coordinates, which live outside the Python object.
+    """
+    seen = set()
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif isinstance(item, shapely.Geometry):
+            total += shapely.get_num_coordinates(item) * 16
+    return total
+
+
+def graph_sizeof(graph: nx.MultiDiGraph) -> int:
+    """deep_sizeof of a graph's node, adjacency and predecessor dicts (edge data is shared by both)."""
+    return deep_sizeof([graph.graph, graph._node, graph._adj, graph._pred])
+
+
+def graph_fingerprint(graph: nx.MultiDiGraph) -> str:
+    """
+    Hash of a graph's node ids and its edges' (u, v, key, length), whatever their insertion order.
+
+    Stored indexes are only reused for a graph with the same fingerprint;
+    equal node and edge counts say nothing about which roads they are.
+    """
+    digest = hashlib.sha256()
+    edges = list(graph.edges(keys=True, data="length", default=0))
+    try:
+        nodes = np.sort(np.fromiter(graph.nodes, dtype=np.int64, count=graph.number_of_nodes()))
+        ids = np.array([(u, v, key) for u, v, key, _ in edges], dtype=np.int64).reshape(-1, 3)
+    except (TypeError, ValueError, OverflowError):
+        # Non-integer ids: slower, order-independent text form
+        digest.update("\n".join(sorted(map(repr, graph.nodes))).encode())
+        digest.update("\n".join(sorted(f"{u!r} {v!r} {key!r} {round(length, 2)}" for u, v, key, length in edges)).encode())
+        return digest.hexdigest()
+
+    lengths = np.round(np.array([length for *_, length in edges], dtype=float) * 100).astype(np.int64)
+    order = np.lexsort((ids[:, 2], ids[:, 1], ids[:, 0]))
+    digest.update(nodes.tobytes())
+    digest.update(ids[order].tobytes())
+    digest.update(lengths[order].tobytes())
+    return digest.hexdigest()
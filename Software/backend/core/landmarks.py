@@ -0,0 +1,116 @@
+import random
+import time
+from typing import Callable, Dict, Hashable, Iterable, List, Optional
+
+import networkx as nx
+import numpy as np
+
+from backend.core.search import Weight, bounded_dijkstra
+
+
+def landmark_distances(graph: nx.MultiDiGraph, landmark: Hashable, weight: Weight = "length"):
+    """Shortest distances from and to one landmark, as {node: distance} dicts."""
+    inf = float("inf")
+    forward = bounded_dijkstra(graph, {landmark: 0}, cutoff=inf, weight=weight)
+    backward = bounded_dijkstra(graph.reverse(copy=False), {landmark: 0}, cutoff=inf, weight=weight)
+    return forward, backward
+
+
+class LandmarkIndex:
+    """
+    ALT (A*, landmarks, triangle inequality) lower bounds on road distance.
+
+    Every node has a landmark vector: its shortest distance from each
+    landmark followed by its distance to each landmark. For any node v and
+    target t and landmark L, d(v, t) >= d(L, t) - d(L, v) and
+    d(v, t) >= d(v, L) - d(t, L), so the largest of these differences is a
+    consistent A* heuristic. Unreachable pairs are inf.
+
+    Args:
+        nodes: Node ids, in the row order of vectors
+        landmarks: Landmark node ids
+        vectors: len(nodes) x 2 * len(landmarks) distances in meters
+    """
+
+    def __init__(self, nodes: List[Hashable], landmarks: List[Hashable], vectors: np.ndarray, build_seconds: float = 0.0):
+        self.nodes = nodes
+        self.landmarks = landmarks
+        self.vectors = vectors
+        self.build_seconds = build_seconds
+        self.rows = {node: i for i, node in enumerate(nodes)}
+        count = len(landmarks)
+        # d(L, t) - d(L, v) and d(v, L) - d(t, L) both become bound[t] - bound[v]
+        self.bounds = np.hstack([vectors[:, :count], -vectors[:, count:]])
+
+    @classmethod
+    def build(cls, graph: nx.MultiDiGraph, count: int = 8, weight: Weight = "length", seed: int = 0) -> "LandmarkIndex":
+        """
+        Pick landmarks by farthest-point selection and compute their distance vectors.
+
+        The first landmark is the node farthest from a random start, every
+        next one the node farthest from all landmarks chosen so far, which
+        spreads them around the edge of the region where bounds are tightest.
+        """
+        start = time.perf_counter()
+        nodes = list(graph.nodes)
+        rows = {node: i for i, node in enumerate(nodes)}
+        count = min(count, len(nodes))
+        vectors = np.full((len(nodes), 2 * count), np.inf)
+
+        def to_array(distances: Dict[Hashable, float]) -> np.ndarray:
+            values = np.full(len(nodes), np.inf)
+            values[[rows[node] for node in distances]] = list(distances.values())
+            return values
+
+        seed_distances = to_array(bounded_dijkstra(graph, {random.Random(seed).choice(nodes): 0}, float("inf"), weight))
+        landmark = nodes[int(np.argmax(np.where(np.isfinite(seed_distances), seed_distances, -1)))]
+        nearest = np.full(len(nodes), np.inf)
+        landmarks = []
+
+        for i in range(count):
+            landmarks.append(landmark)
+            forward, backward = landmark_distances(graph, landmark, weight)
+            vectors[:, i] = to_array(forward)
+            vectors[:, count + i] = to_array(backward)
+
+            # Nodes this landmark cannot reach score 0 so isolated fragments are not picked
+            nearest = np.minimum(nearest, np.where(np.isfinite(vectors[:, i]), vectors[:, i], 0))
+            nearest[[rows[node] for node in landmarks]] = -1
+            landmark = nodes[int(np.argmax(nearest))]
+
+        return cls(nodes, landmarks, vectors, build_seconds=time.perf_counter() - start)
+
+    def heuristic(self, targets: Iterable[Hashable], scale: float = 1.0) -> Callable[[Hashable], float]:
+        """
+        Lower bound on the distance from a node to the nearest of targets.
+
+        Bounds for all nodes are computed up front in one vectorized pass,
+        which costs far less than a numpy call per node once a search
+        settles more than a handful of nodes.
+
+        Args:
+            targets: Target nodes
+            scale: Multiplier on the bound, e.g. 1 / top speed for travel times
+        """
+        target_rows = [self.rows[t] for t in targets if t in self.rows]
+        if not target_rows:
+            return lambda node: 0
+        estimates = np.full(len(self.nodes), np.nan)
+        # inf - inf pairs are unknown: fmax/fmin skip the NaNs they produce
+        with np.errstate(invalid="ignore"):
+            for row in target_rows:
+                estimates = np.fmin(estimates, np.fmax.reduce(self.bounds[row] - self.bounds, axis=1))
+        estimates = (np.where(np.isnan(estimates), 0.0, np.maximum(estimates, 0.0)) * scale).tolist()
+        rows = self.rows
+        return lambda node: estimates[rows[node]] if node in rows else 0.0
+
+    def vector(self, node: Hashable) -> Optional[np.ndarray]:
+        row = self.rows.get(node)
+        return None if row is None else self.vectors[row]
+
+    def info(self) -> Dict:
+        return {
+            "landmarks": len(self.landmarks),
+            "build_seconds": round(self.build_seconds, 3),
+            "vector_mb": round(self.vectors.nbytes / 1024 ** 2, 2),
+        }
@@ -1,15 +1,133 @@
-from geopy.geocoders import Nominatim
+import json
+import math
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import networkx as nx
 import osmnx as ox
 import pandas as pd
 import geopandas as gpd
+import requests
+from functools import lru_cache
 from typing import Dict, List, Optional
 from backend.benchmark import benchmark
-from shapely.geometry import Point
+from shapely.geometry import LineString, Point, Polygon, box
 
-geolocator = Nominatim(user_agent="vector-planner")
+DRIVE_HIGHWAY_PATTERN = "motorway|trunk|primary|secondary|tertiary|residential"
+
+# Areas wider than one tile are downloaded tile by tile on a bounded worker pool
+TILE_KM = 20
+FETCH_WORKERS = int(os.environ.get("OSM_FETCH_WORKERS", 4))
+
+# Concurrent requests per client when the Overpass server's /status does not say (public instances allow 2)
+DEFAULT_OVERPASS_SLOTS = 2
+
+# Nominatim usage policy: at most one request per second, counted across all threads
+NOMINATIM_INTERVAL_S = 1.0
+
+_nominatim_lock = threading.Lock()
+_nominatim_last = 0.0
+_nominatim_interval_s = NOMINATIM_INTERVAL_S
+
+
+def configure_osm(environ=os.environ):
+    """
+    Apply OSM endpoint overrides from the environment, called once at startup.
+
+    OVERPASS_URL and NOMINATIM_URL point osmnx at a local stand-in, which
+    is then not rate limited; OSM_CACHE_DIR at a directory of cached responses.
+    """
+    global _nominatim_interval_s
+    if environ.get("OVERPASS_URL"):
+        ox.settings.overpass_url = environ["OVERPASS_URL"]
+        ox.settings.overpass_rate_limit = False
+    if environ.get("NOMINATIM_URL"):
+        ox.settings.nominatim_url = environ["NOMINATIM_URL"]
+        _nominatim_interval_s = 0.0
+    if environ.get("OSM_CACHE_DIR"):
+        ox.settings.cache_folder = environ["OSM_CACHE_DIR"]
+        ox.settings.use_cache = True
+
+
+def nominatim_request(fn, *args, **kwargs):
+    """Run one Nominatim lookup (geopy or osmnx), serialized and spaced by the usage policy interval."""
+    global _nominatim_last
+    if not _nominatim_interval_s:
+        return fn(*args, **kwargs)
+    with _nominatim_lock:
+        wait = _nominatim_last + _nominatim_interval_s - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _nominatim_last = time.monotonic()
+
+
+@lru_cache(maxsize=8)
+def overpass_slots(url: str) -> int:
+    """Concurrent requests the Overpass server at url allows this client, from the "Rate limit" in its /status."""
+    try:
+        status = requests.get(url.rstrip("/") + "/status", timeout=5).text
+        match = re.search(r"Rate limit: (\d+)", status)
+        if match:
+            # 0 means the server does not limit this client
+            return int(match.group(1)) or FETCH_WORKERS
+    except requests.RequestException as e:
+        print(f"Could not read Overpass status: {e}")
+    return DEFAULT_OVERPASS_SLOTS
+
+
+# Tags osmnx keeps while parsing ways and nodes. Routing reads highway only and
+# oneway/junction decide edge directions, so the rest is never materialized
+# (VectorDatabase slims what is left). OSM_ALL_TAGS=1 keeps the osmnx defaults.
+ROUTING_WAY_TAGS = ["highway", "oneway", "junction"]
+ROUTING_NODE_TAGS = ["highway", "junction"]
+
+_tags_lock = threading.Lock()
+_tags_users = 0
+_saved_tags = None
+
+
+@contextmanager
+def routing_tags():
+    """
+    Parse OSM data with only ROUTING_WAY_TAGS and ROUTING_NODE_TAGS inside this block.
+
+    osmnx reads the tags from its global settings, so they are swapped in
+    by the first of any concurrent downloads and the previous values are
+    restored when the last one finishes.
+    """
+    global _tags_users, _saved_tags
+    if os.environ.get("OSM_ALL_TAGS"):
+        yield
+        return
+    with _tags_lock:
+        if _tags_users == 0:
+            _saved_tags = (ox.settings.useful_tags_way, ox.settings.useful_tags_node)
+            ox.settings.useful_tags_way = ROUTING_WAY_TAGS
+            ox.settings.useful_tags_node = ROUTING_NODE_TAGS
+        _tags_users += 1
+    try:
+        yield
+    finally:
+        with _tags_lock:
+            _tags_users -= 1
+            if _tags_users == 0:
+                ox.settings.useful_tags_way, ox.settings.useful_tags_node = _saved_tags
+
+
+@lru_cache(maxsize=1)
+def get_geolocator():
+    """Nominatim client, created on the first reverse geocode."""
+    from geopy.geocoders import Nominatim
+    return Nominatim(user_agent="vector-planner")
 
 def get_city_name(lat: float, lon: float) -> str:
-    location = geolocator.reverse((lat, lon), language='en')
+    location = nominatim_request(get_geolocator().reverse, (lat, lon), language='en')
 
     if not location or not location.raw or "address" not in location.raw:
         raise ValueError("Unable to reverse geocode the coordinates.")
@@ -30,7 +148,7 @@ def is_coords(item):
 
 def safe_geocode(place_name):
     try:
-        gdf = ox.geocode_to_gdf(place_name, which_result=1)
+        gdf = nominatim_request(ox.geocode_to_gdf, place_name, which_result=1)
         geom = gdf.geometry.iloc[0]
         if geom.geom_type not in ("Polygon", "MultiPolygon"):
             raise ValueError(f"Geocoded result is not a Polygon/MultiPolygon (got {geom.geom_type})")
@@ -38,7 +156,7 @@ def safe_geocode(place_name):
     except Exception as e:
         print(f"Attempt failed for '{place_name}': {e}")
         try:
-            lat, lon = ox.geocode(place_name)
+            lat, lon = nominatim_request(ox.geocode, place_name)
             buffer = Point(lon, lat).buffer(0.05)  # oko 5 km
             print(f"Using fallback circular buffer for '{place_name}'")
             return gpd.GeoDataFrame(geometry=[buffer], crs="EPSG:4326")
@@ -47,45 +165,170 @@ def safe_geocode(place_name):
             raise
 
 
+def download_bbox_graph(bbox, network_type: str = "drive", tile_km: Optional[float] = TILE_KM,
+                        max_workers: int = FETCH_WORKERS) -> nx.MultiDiGraph:
+    """Download the drivable road graph inside a (west, south, east, north) bounding box."""
+    return download_polygon_graph(box(*bbox), network_type, tile_km=tile_km, max_workers=max_workers)
+
+
 @benchmark()
-def fetch_osm_data(
-        received_data: List[str] = ["Varaždin, Croatia", "Čakovec, Croatia"],
-        network_type: str = "drive",
-        save_to_file: Optional[str] = "backend/data/croatia_cities.graphml",
-        padding_km: float = 5
-) -> Dict:
+def load_raw_export(path: str, save_to_file: Optional[str] = None) -> nx.MultiDiGraph:
     """
-    Fetch and merge OSM data for multiple cities using an expanded bounding box.
+    Build the road graph from a local Overpass JSON export instead of downloading it.
 
     Args:
-        received_data: List of OSM-compatible place names
-        network_type: "drive", "walk", "bike"
-        save_to_file: Optional path to save the merged graph
-        padding_km: Extra distance added to bbox in all directions
+        path: Overpass "generic format" JSON file (see Documentation/)
+        save_to_file: Optional GraphML path to snapshot the built graph
 
     Returns:
-        dict with "graph", "nodes", and "edges"
+        Simplified MultiDiGraph with edge lengths, filtered like fetch_osm_data
     """
+    with open(path, encoding="utf-8") as f:
+        response_json = json.load(f)
 
-    ox.settings.timeout = 300
-    ox.settings.log_console = True
+    highway = re.compile(DRIVE_HIGHWAY_PATTERN)
+    response_json["elements"] = [
+        element for element in response_json["elements"]
+        if element["type"] == "node" or highway.search(element.get("tags", {}).get("highway", ""))
+    ]
+
+    with routing_tags():
+        G = ox.graph._create_graph([response_json], bidirectional=False)
+    G.remove_nodes_from(list(nx.isolates(G)))
+    G = ox.simplify_graph(G)
+    G = ox.distance.add_edge_lengths(G)
+    print(f"Loaded raw export with {len(G.nodes())} nodes and {len(G.edges())} edges.")
+
+    if save_to_file:
+        ox.save_graphml(G, filepath=save_to_file)
+        print(f"Saved graph snapshot to {save_to_file}")
+
+    return G
+
+
+def split_into_tiles(polygon: Polygon, tile_km: float) -> List[Polygon]:
+    """Cut a lon/lat polygon along a grid of roughly tile_km squares, dropping empty cells."""
+    west, south, east, north = polygon.bounds
+    lat_step = tile_km / 111
+    lon_step = tile_km / (111 * math.cos(math.radians((south + north) / 2)))
+
+    tiles = []
+    for row in range(max(1, math.ceil((north - south) / lat_step))):
+        for col in range(max(1, math.ceil((east - west) / lon_step))):
+            cell = box(
+                west + col * lon_step, south + row * lat_step,
+                min(east, west + (col + 1) * lon_step), min(north, south + (row + 1) * lat_step)
+            )
+            tile = cell.intersection(polygon)
+            if tile.geom_type in ("Polygon", "MultiPolygon") and not tile.is_empty:
+                tiles.append(tile)
+    return tiles
 
-    place_names = []
-    for item in received_data:
-        if is_coords(item):
-            name = get_city_name(*item)
-            place_names.append(name)
-        elif isinstance(item, str):
-            place_names.append(item)
+
+def _download_tile(polygon: Polygon, network_type: str) -> Optional[nx.MultiDiGraph]:
+    # Unsimplified, so ways crossing the tile border are identical segments in both tiles
+    try:
+        return ox.graph_from_polygon(
+            polygon,
+            network_type=network_type,
+            retain_all=True,
+            simplify=False,
+            truncate_by_edge=True,
+            custom_filter=f'["highway"~"{DRIVE_HIGHWAY_PATTERN}"]'
+        )
+    except (ox._errors.InsufficientResponseError, ValueError):
+        # No roads in this tile (osmnx raises ValueError when none of the nodes are inside)
+        return None
+
+
+def merge_tile_graphs(graphs: List[nx.MultiDiGraph]) -> nx.MultiDiGraph:
+    """
+    Merge unsimplified tile graphs, keeping one copy of segments present in several tiles.
+
+    Nodes are shared by OSM id. Segments are identified by (u, v, way id)
+    rather than the multigraph key, which depends on the order each tile
+    added parallel edges.
+    """
+    merged = nx.MultiDiGraph(**graphs[0].graph)
+    seen = set()
+    for G in graphs:
+        merged.add_nodes_from(G.nodes(data=True))
+        for u, v, data in G.edges(data=True):
+            segment = (u, v, data.get("osmid"))
+            if segment in seen:
+                continue
+            seen.add(segment)
+            merged.add_edge(u, v, **data)
+    return merged
+
+
+def download_polygon_graph(polygon: Polygon, network_type: str = "drive", tile_km: Optional[float] = TILE_KM,
+                           max_workers: int = FETCH_WORKERS) -> nx.MultiDiGraph:
+    """Download the drivable road graph inside a lon/lat polygon, in parallel tiles if it is large."""
+    tiles = split_into_tiles(polygon, tile_km) if tile_km else [polygon]
+
+    # Only the tags routing needs are parsed from the responses
+    with routing_tags():
+        if len(tiles) <= 1:
+            print("Downloading OSM graph from polygon...")
+            G = ox.graph_from_polygon(
+                polygon,
+                network_type=network_type,
+                retain_all=True,
+                simplify=True,
+                truncate_by_edge=True,
+                custom_filter=f'["highway"~"{DRIVE_HIGHWAY_PATTERN}"]'
+            )
         else:
-            raise ValueError(f"Unsupported route input: {item}")
+            # More parallel requests than a rate-limited server has slots for would only queue or be rejected
+            workers = max_workers
+            if ox.settings.overpass_rate_limit:
+                workers = min(max_workers, overpass_slots(ox.settings.overpass_url))
+            print(f"Downloading OSM graph in {len(tiles)} tiles with {workers} workers...")
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                graphs = [G for G in pool.map(lambda tile: _download_tile(tile, network_type), tiles) if G is not None]
+            if not graphs:
+                raise ValueError("No roads found in the requested area.")
+            G = ox.simplify_graph(merge_tile_graphs(graphs))
+
+    print(f"Graph downloaded with {len(G.nodes())} nodes and {len(G.edges())} edges.")
+    return ox.distance.add_edge_lengths(G)
 
-    print(f"Fetching {len(place_names)} cities...", flush=True)
-    print(place_names[0] + " - " + place_names[1])
 
-    # 1. Fetch city boundaries
-    print("Fetching city boundaries...")
-    city_boundaries = [safe_geocode(name) for name in place_names]
+def corridor_polygon(endpoints: List, buffer_km: float) -> Polygon:
+    """
+    Buffer the straight line through [lat, lon] endpoints by buffer_km on each side.
+
+    The area grows linearly with route length, unlike a padded bounding box
+    which grows with its square for diagonal routes.
+    """
+    line = LineString([(lon, lat) for lat, lon in endpoints])
+    projected, crs = ox.projection.project_geometry(line)
+    polygon, _ = ox.projection.project_geometry(projected.buffer(buffer_km * 1000), crs=crs, to_latlong=True)
+    return polygon
+
+
+def _place_name(item) -> str:
+    if is_coords(item):
+        return get_city_name(*item)
+    if isinstance(item, str):
+        return item
+    raise ValueError(f"Unsupported route input: {item}")
+
+
+def padded_city_bbox(received_data: List, padding_km: float, max_workers: int = FETCH_WORKERS):
+    """Bounding box (W, S, E, N) of the city boundaries around each input, padded in all directions."""
+    # Lookups overlap only against a local Nominatim, the public one gets one request per second
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        place_names = list(pool.map(_place_name, received_data))
+
+        print(f"Fetching {len(place_names)} cities...", flush=True)
+        print(place_names[0] + " - " + place_names[1])
+
+        # 1. Fetch city boundaries
+        print("Fetching city boundaries...")
+        city_boundaries = list(pool.map(safe_geocode, place_names))
+
     city_gdf = gpd.GeoDataFrame(pd.concat(city_boundaries, ignore_index=True))
     city_gdf.crs = "EPSG:4326"
 
@@ -102,18 +345,58 @@ def fetch_osm_data(
     east += padding_deg
     west -= padding_deg
 
-    # 3. Download graph from bbox
-    print("Downloading OSM graph from bounding box...")
-    G = ox.graph_from_bbox(
-        bbox=(west, south, east, north),
-        network_type=network_type,
-        retain_all=True,
-        simplify=True,
-        truncate_by_edge=True,
-        custom_filter='["highway"~"motorway|trunk|primary|secondary|tertiary|residential"]'
-    )
-    print(f"Graph downloaded with {len(G.nodes())} nodes and {len(G.edges())} edges.")
-    G = ox.distance.add_edge_lengths(G)
+    return west, south, east, north
+
+
+@benchmark()
+def fetch_osm_data(
+        received_data: List[str] = ["Varaždin, Croatia", "Čakovec, Croatia"],
+        network_type: str = "drive",
+        save_to_file: Optional[str] = "backend/data/croatia_cities.graphml",
+        padding_km: float = 5,
+        mode: str = "bbox",
+        corridor_buffer_km: float = 2,
+        tile_km: Optional[float] = TILE_KM,
+        max_workers: int = FETCH_WORKERS
+) -> Dict:
+    """
+    Fetch and merge OSM data for multiple cities using an expanded bounding box
+    or a corridor around the route.
+
+    Args:
+        received_data: List of OSM-compatible place names or [lat, lon] pairs
+        network_type: "drive", "walk", "bike"
+        save_to_file: Optional path to save the merged graph
+        padding_km: Extra distance added to bbox in all directions
+        mode: "bbox" for the padded bounding box of both cities, "corridor"
+            for a band of corridor_buffer_km on each side of the straight line
+            between the inputs (no city boundary lookups needed)
+        corridor_buffer_km: Half-width of the corridor
+        tile_km: Tile size for parallel download of large areas, None for one request
+        max_workers: Concurrent geocoding and tile requests, tiles also capped by the Overpass server's slots
+
+    Returns:
+        dict with "graph", "nodes", "edges" and the downloaded "area" polygon
+    """
+
+    ox.settings.timeout = 300
+    ox.settings.log_console = True
+
+    if mode == "corridor":
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            endpoints = list(pool.map(
+                lambda item: list(item) if is_coords(item) else nominatim_request(ox.geocode, item), received_data
+            ))
+        area = corridor_polygon(endpoints, corridor_buffer_km)
+        G = download_polygon_graph(area, network_type, tile_km=tile_km, max_workers=max_workers)
+    elif mode == "bbox":
+        west, south, east, north = padded_city_bbox(received_data, padding_km, max_workers)
+        area = box(west, south, east, north)
+
+        # 3. Download graph from bbox
+        G = download_bbox_graph((west, south, east, north), network_type, tile_km=tile_km, max_workers=max_workers)
+    else:
+        raise ValueError(f"Unsupported fetch mode: {mode}")
 
     if save_to_file:
         ox.save_graphml(G, filepath=save_to_file)
@@ -149,6 +432,7 @@ def fetch_osm_data(
     return {
         "graph": G,
         "nodes": nodes,
-        "edges": edges
+        "edges": edges,
+        "area": area
     }
 ## NOVI OSM DATA LOADER
\ No newline at end of file
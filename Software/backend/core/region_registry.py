@@ -0,0 +1,292 @@
+import math
+import os
+import re
+import shutil
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+import networkx as nx
+import shapely
+from shapely.geometry import Point, box
+
+from backend.benchmark import traced_memory_mb
+
+if TYPE_CHECKING:
+    from backend.core.vector_db import VectorDatabase
+
+# Request history is bucketed into square cells of this size (degrees, ~11 km)
+HISTORY_CELL_DEG = 0.1
+
+# Requests closer than this to a region's edge are not served by it (~200 m)
+EDGE_MARGIN_DEG = 0.002
+
+
+def graph_bbox(graph: nx.MultiDiGraph) -> Tuple[float, float, float, float]:
+    xs = [data["x"] for _, data in graph.nodes(data=True)]
+    ys = [data["y"] for _, data in graph.nodes(data=True)]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def coords_to_cell(lat: float, lon: float, cell_deg: float = HISTORY_CELL_DEG) -> Tuple[int, int]:
+    return int(lat // cell_deg), int(lon // cell_deg)
+
+
+def radius_bbox(lat: float, lon: float, radius_km: float) -> Tuple[float, float, float, float]:
+    lat_deg = radius_km / 111
+    lon_deg = radius_km / (111 * math.cos(math.radians(lat)))
+    return lon - lon_deg, lat - lat_deg, lon + lon_deg, lat + lat_deg
+
+
+def cell_to_bbox(cell: Tuple[int, int], cell_deg: float = HISTORY_CELL_DEG) -> Tuple[float, float, float, float]:
+    row, col = cell
+    return col * cell_deg, row * cell_deg, (col + 1) * cell_deg, (row + 1) * cell_deg
+
+
+class Region:
+    def __init__(self, name: str, db: "VectorDatabase", source: str, pinned: bool = False, area=None,
+                 storage_path: Optional[str] = None):
+        self.name = name
+        self.db = db
+        self.storage_path = storage_path
+        self.source = source
+        self.pinned = pinned
+        self.bbox = graph_bbox(db.graph)
+        # Downloaded polygon (e.g. a route corridor), the bbox alone would claim points outside it
+        self.area = area
+        if area is not None:
+            shapely.prepare(area)
+        self.loaded_at = time.time()
+        self.last_used = self.loaded_at
+        self.hits = 0
+        # Python heap grown while building the region, when tracemalloc is on
+        self.traced_build_mb: Optional[float] = None
+
+    @property
+    def graph(self) -> nx.MultiDiGraph:
+        return self.db.graph
+
+    def contains(self, lat: float, lon: float, margin_deg: float = EDGE_MARGIN_DEG) -> bool:
+        west, south, east, north = self.bbox
+        in_bbox = (west + margin_deg <= lon <= east - margin_deg
+                   and south + margin_deg <= lat <= north - margin_deg)
+        if not in_bbox or self.area is None:
+            return in_bbox
+        point = Point(lon, lat)
+        return self.area.contains(point) and self.area.boundary.distance(point) >= margin_deg
+
+    def covers_bbox(self, bbox: Tuple[float, float, float, float]) -> bool:
+        # Every road inside a downloaded area was fetched, even where the graph's own extent stops short of it
+        if self.area is not None:
+            return self.area.covers(box(*bbox))
+        west, south, east, north = bbox
+        return self.contains(south, west, margin_deg=0) and self.contains(north, east, margin_deg=0)
+
+    def info(self) -> Dict:
+        return {
+            "name": self.name,
+            "source": self.source,
+            "pinned": self.pinned,
+            "bbox": list(self.bbox),
+            "nodes": self.graph.number_of_nodes(),
+            "edges": self.graph.number_of_edges(),
+            "traffic": self.db.overlay.info(),
+            "landmarks": self.db.landmark_index.info() if self.db.landmark_index else None,
+            "hits": self.hits,
+            "loaded_at": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.loaded_at)),
+            "idle_s": round(time.time() - self.last_used, 1),
+        }
+
+    def memory(self) -> Dict:
+        return {
+            "name": self.name,
+            "traced_build_mb": None if self.traced_build_mb is None else round(self.traced_build_mb, 1),
+            **self.db.memory_report(),
+        }
+
+
+class RegionRegistry:
+    """
+    Loaded road graphs and their vector indexes, looked up by coordinates.
+
+    A request is served by the smallest loaded region whose bounding box
+    contains all of its points. Unpinned regions are evicted least recently
+    used once more than max_regions are loaded; preloaded regions are pinned.
+
+    With a storage_dir every pinned region gets its own on-disk Qdrant
+    directory, so its embeddings are reused on the next start instead of
+    rebuilt. Ad-hoc regions (route corridors, prefetched cells) are kept in
+    memory, and any storage a dropped region had is deleted with it.
+    """
+
+    def __init__(self, vector_size: int = 64, max_regions: int = 8):
+        self.vector_size = vector_size
+        self.max_regions = max_regions
+        self.storage_dir: Optional[str] = None
+        self.db_options: Dict = {}
+        self.regions: "OrderedDict[str, Region]" = OrderedDict()
+        self.history: Counter = Counter()
+        # Latest live value per (u, v, key, field) in the order they were set, replayed onto
+        # regions registered later; key None entries apply to all parallel edges
+        self.traffic: Dict[tuple, Any] = {}
+        self.last_request_at = 0.0
+        # Called with each region evicted or replaced, e.g. to free state built on it
+        self.drop_listeners: List[Callable[[Region], None]] = []
+        self._lock = threading.RLock()
+
+    def configure(self, storage_dir: Optional[str] = None, **db_options):
+        """Set Qdrant storage and index options (see VectorDatabase) for regions registered from now on."""
+        self.storage_dir = storage_dir
+        self.db_options = db_options
+
+    def storage_path(self, name: str) -> Optional[str]:
+        if not self.storage_dir or self.db_options.get("url"):
+            return None
+        return os.path.join(self.storage_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", name))
+
+    def prune_storage(self, keep: List[str]) -> List[str]:
+        """Delete storage directories of regions not named in keep, e.g. route corridors from earlier runs."""
+        if not self.storage_dir or not os.path.isdir(self.storage_dir):
+            return []
+        kept = {os.path.basename(self.storage_path(name)) for name in keep}
+        removed = []
+        for entry in os.listdir(self.storage_dir):
+            path = os.path.join(self.storage_dir, entry)
+            if entry not in kept and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+                removed.append(entry)
+        return removed
+
+    def find(self, coords: List[List[float]], bbox: Optional[Tuple[float, float, float, float]] = None) -> Optional[Region]:
+        """Smallest loaded region containing all coords and, when given, covering the whole bbox."""
+        with self._lock:
+            candidates = [
+                region for region in self.regions.values()
+                if all(region.contains(lat, lon) for lat, lon in coords)
+                and (bbox is None or region.covers_bbox(bbox))
+            ]
+            if not candidates:
+                return None
+            region = min(candidates, key=lambda r: (r.bbox[2] - r.bbox[0]) * (r.bbox[3] - r.bbox[1]))
+            region.hits += 1
+            region.last_used = time.time()
+            self.regions.move_to_end(region.name)
+            return region
+
+    def get(self, name: str) -> Optional[Region]:
+        with self._lock:
+            return self.regions.get(name)
+
+    def register(self, name: str, graph: nx.MultiDiGraph, source: str, pinned: bool = False, area=None,
+                 landmarks: Optional[bool] = None) -> Region:
+        """
+        Build and add a region, evicting the least recently used unpinned ones beyond max_regions.
+
+        Landmarks (ALT A*) cost two full Dijkstras each, so by default only pinned
+        regions, built at warm-up, get them; landmarks=True also builds them for
+        regions loaded off the request path (prefetch). Others route with Dijkstra.
+        """
+        # Qdrant's client is imported with the first region rather than at startup
+        from backend.core.vector_db import VectorDatabase
+
+        # A region re-registered under its name (e.g. a widened route corridor) is dropped
+        # first: local Qdrant locks its storage folder, and the new graph must not be
+        # upserted over the old one's points
+        with self._lock:
+            previous = self.regions.pop(name, None)
+        if previous is not None:
+            self._drop(previous)
+
+        # Embedding is the slow part, so build the index before taking the lock
+        traced_before = traced_memory_mb()
+        storage_path = self.storage_path(name) if pinned else None
+        db_options = dict(self.db_options)
+        if not (pinned if landmarks is None else landmarks):
+            db_options["landmarks"] = 0
+        if db_options.get("url"):
+            # Regions on one Qdrant server need their own collections
+            db_options.setdefault("collection_prefix", re.sub(r"[^A-Za-z0-9_]", "_", name))
+        db = VectorDatabase(vector_size=self.vector_size, storage_path=storage_path, **db_options)
+        db.create_embeddings(graph)
+        region = Region(name, db, source=source, pinned=pinned, area=area, storage_path=storage_path)
+        if traced_before is not None:
+            region.traced_build_mb = traced_memory_mb() - traced_before
+
+        with self._lock:
+            if self.traffic:
+                db.overlay.apply_updates([
+                    {"u": u, "v": v, "key": key, field: value} for (u, v, key, field), value in self.traffic.items()
+                ])
+            previous = self.regions.pop(name, None)
+            if previous is not None:
+                # Registered concurrently under the same name while this one was building
+                self._drop(previous)
+            self.regions[name] = region
+            self.regions.move_to_end(name)
+            self._evict()
+        print(f"Registered region '{name}' ({source}) with {graph.number_of_nodes()} nodes")
+        return region
+
+    def _evict(self):
+        unpinned = [name for name, region in self.regions.items() if not region.pinned]
+        while len(self.regions) > self.max_regions and unpinned:
+            name = unpinned.pop(0)
+            self._drop(self.regions.pop(name))
+            print(f"Evicted region '{name}'")
+
+    def on_drop(self, listener: Callable[[Region], None]):
+        self.drop_listeners.append(listener)
+
+    def _drop(self, region: Region):
+        for listener in self.drop_listeners:
+            listener(region)
+        region.db.close()
+        if region.storage_path and not region.pinned and os.path.isdir(region.storage_path):
+            shutil.rmtree(region.storage_path, ignore_errors=True)
+
+    def apply_traffic(self, updates: List[Dict]) -> Dict[str, Dict]:
+        """Apply live edge updates (see WeightOverlay.apply_updates) to every loaded region."""
+        with self._lock:
+            for update in updates:
+                for field in ("speed_kmh", "closed"):
+                    if update.get(field) is not None:
+                        # Moved to the end, so the replay applies values in the order they were last set
+                        entry = (update["u"], update["v"], update.get("key"), field)
+                        self.traffic.pop(entry, None)
+                        self.traffic[entry] = update[field]
+            return {name: region.db.overlay.apply_updates(updates) for name, region in self.regions.items()}
+
+    def reset_traffic(self):
+        with self._lock:
+            self.traffic.clear()
+            for region in self.regions.values():
+                region.db.overlay.reset()
+
+    def record_request(self, coords: List[List[float]]):
+        with self._lock:
+            self.last_request_at = time.time()
+            for lat, lon in coords:
+                self.history[coords_to_cell(lat, lon)] += 1
+
+    def top_cells(self, min_requests: int = 1) -> List[Tuple[int, int]]:
+        with self._lock:
+            return [cell for cell, count in self.history.most_common() if count >= min_requests]
+
+    def is_covered(self, bbox: Tuple[float, float, float, float]) -> bool:
+        with self._lock:
+            return any(region.covers_bbox(bbox) for region in self.regions.values())
+
+    def memory_report(self) -> List[Dict]:
+        with self._lock:
+            return [region.memory() for region in self.regions.values()]
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                "regions": [region.info() for region in self.regions.values()],
+                "requested_cells": len(self.history),
+            }
+
+
+registry = RegionRegistry(vector_size=64)
@@ -0,0 +1,175 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from backend.core.region_registry import Region, registry
+
+# Tries at a query whose costs keep changing mid-search, the last result is returned as is
+ROUTE_ATTEMPTS = 3
+
+
+class RouteSession:
+    """
+    One client's re-routing state: the shortest-path tree from its current source.
+
+    The tree is rebuilt when the source moves, the metric changes or live
+    traffic changes the region's costs (overlay version), and otherwise
+    grows across destinations. Queries on one session are serialized, as
+    they extend the same tree.
+    """
+
+    def __init__(self, session_id: str, region: Region):
+        self.session_id = session_id
+        self.region = region
+        self.source_coords: Optional[List[float]] = None
+        self.metric: Optional[str] = None
+        self.version: Optional[int] = None
+        self.tree = None
+        self.src = None
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.queries = 0
+        self.rebuilds = 0
+        self._lock = threading.Lock()
+
+    def route(self, source_coords: List[float], dest_coords: List[float], metric: str) -> Dict:
+        """
+        Route to dest_coords from the session's tree, rebuilding it first if stale.
+
+        A traffic update landing while the query extends the tree leaves it
+        with distances from two sets of costs, so the version is checked
+        again afterwards and the tree rebuilt and queried again if it moved.
+
+        Returns:
+            find_optimal_route fields without visualizations, plus a "session" entry
+            with whether the tree was reused, the nodes settled for this query and the tree size
+        """
+        db = self.region.db
+        with self._lock:
+            reused = (self.tree is not None and self.source_coords == list(source_coords)
+                      and self.metric == metric and self.version == db.overlay.version)
+            for _ in range(ROUTE_ATTEMPTS):
+                if not reused:
+                    # Read before building, so an update during the build is caught below
+                    self.version = db.overlay.version
+                    self.tree, self.src = db.route_tree(source_coords, metric)
+                    self.source_coords = list(source_coords)
+                    self.metric = metric
+                    self.rebuilds += 1
+
+                stats = {}
+                result = db.route_from_tree(self.tree, self.src, dest_coords, metric, stats=stats)
+                if self.version == db.overlay.version:
+                    break
+                reused = False
+            self.queries += 1
+            self.last_used = time.time()
+
+        result["session"] = {
+            "session_id": self.session_id,
+            "reused_tree": reused,
+            "settled": stats.get("settled", 0),
+            "tree_nodes": stats.get("tree_nodes", 0),
+        }
+        return result
+
+    @property
+    def tree_nodes(self) -> int:
+        return len(self.tree.dist) if self.tree is not None else 0
+
+    def info(self) -> Dict:
+        return {
+            "session_id": self.session_id,
+            "region": self.region.name,
+            "metric": self.metric,
+            "tree_nodes": self.tree_nodes,
+            "queries": self.queries,
+            "rebuilds": self.rebuilds,
+            "idle_s": round(time.time() - self.last_used, 1),
+        }
+
+
+class RouteSessionCache:
+    """
+    Re-routing sessions by id, bounded by count, total tree size and idle time.
+
+    Sessions idle for longer than idle_seconds are dropped on the next
+    lookup, and beyond max_sessions or max_tree_nodes (summed over all
+    trees) the least recently used ones go. Sessions on a region the
+    registry evicts or replaces are dropped with it.
+    """
+
+    def __init__(self, max_sessions: int = 32, idle_seconds: float = 300, max_tree_nodes: int = 2_000_000):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.max_tree_nodes = max_tree_nodes
+        self.sessions: "OrderedDict[str, RouteSession]" = OrderedDict()
+        self.evicted = 0
+        self._lock = threading.Lock()
+
+    def configure(self, max_sessions: Optional[int] = None, idle_seconds: Optional[float] = None,
+                  max_tree_nodes: Optional[int] = None):
+        with self._lock:
+            if max_sessions is not None:
+                self.max_sessions = max_sessions
+            if idle_seconds is not None:
+                self.idle_seconds = idle_seconds
+            if max_tree_nodes is not None:
+                self.max_tree_nodes = max_tree_nodes
+            self._evict()
+
+    def get_or_create(self, session_id: Optional[str], region: Region) -> RouteSession:
+        """The session with this id when it is still live and on region, otherwise a new one."""
+        with self._lock:
+            self._evict()
+            session = self.sessions.get(session_id) if session_id else None
+            if session is None or session.region is not region:
+                session = RouteSession(session_id or uuid.uuid4().hex, region)
+                self.sessions[session.session_id] = session
+            self.sessions.move_to_end(session.session_id)
+            self._evict()
+            return session
+
+    def close(self, session_id: str) -> bool:
+        with self._lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def drop_region(self, region: Region):
+        """Drop the sessions routing on region, so their trees do not keep it in memory."""
+        with self._lock:
+            for session_id in [sid for sid, session in self.sessions.items() if session.region is region]:
+                del self.sessions[session_id]
+                self.evicted += 1
+
+    def _evict(self):
+        cutoff = time.time() - self.idle_seconds
+        for session_id in [sid for sid, session in self.sessions.items() if session.last_used < cutoff]:
+            del self.sessions[session_id]
+            self.evicted += 1
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+            self.evicted += 1
+        # Trees grow with every query, the most recently used session is kept whatever its size
+        tree_nodes = sum(session.tree_nodes for session in self.sessions.values())
+        while tree_nodes > self.max_tree_nodes and len(self.sessions) > 1:
+            _, session = self.sessions.popitem(last=False)
+            tree_nodes -= session.tree_nodes
+            self.evicted += 1
+
+    def info(self) -> Dict:
+        with self._lock:
+            self._evict()
+            return {
+                "sessions": len(self.sessions),
+                "max_sessions": self.max_sessions,
+                "idle_seconds": self.idle_seconds,
+                "evicted": self.evicted,
+                "tree_nodes": sum(session.tree_nodes for session in self.sessions.values()),
+                "max_tree_nodes": self.max_tree_nodes,
+            }
+
+
+route_sessions = RouteSessionCache()
+registry.on_drop(route_sessions.drop_region)
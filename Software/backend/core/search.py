@@ -0,0 +1,243 @@
+import heapq
+from itertools import count
+from typing import Callable, Dict, Hashable, List, Optional, Tuple, Union
+
+import networkx as nx
+
+Weight = Union[str, Callable]
+
+
+def weight_function(graph: nx.MultiDiGraph, weight: Weight) -> Callable:
+    """
+    Turn a weight attribute name into (u, v, edge_data) -> cost, like networkx does.
+
+    For multigraphs edge_data is the {key: attributes} dict of parallel edges
+    and the cheapest one is used. A callable returning None hides the edge.
+    """
+    if callable(weight):
+        return weight
+    if graph.is_multigraph():
+        return lambda u, v, d: min(attr.get(weight, 1) for attr in d.values())
+    return lambda u, v, d: d.get(weight, 1)
+
+
+def dijkstra_with_offsets(
+        graph: nx.MultiDiGraph,
+        sources: Dict[Hashable, float],
+        targets: Dict[Hashable, float],
+        weight: Weight = "length",
+        heuristic: Optional[Callable[[Hashable], float]] = None,
+        stats: Optional[Dict] = None
+) -> Tuple[float, Optional[List[Hashable]]]:
+    """
+    Dijkstra from several start nodes to several end nodes with extra costs on both sides.
+
+    Used to route between positions part-way along an edge: each source is
+    seeded with the cost of reaching it from the start position, and each
+    target adds the cost of continuing to the end position.
+
+    With a heuristic this is A*: nodes are expanded by cost plus a lower
+    bound on the remaining cost to the nearest target. The bound must be
+    consistent (e.g. landmark bounds), as every node is settled only once.
+
+    Args:
+        graph: Road graph
+        sources: {node: initial cost}
+        targets: {node: cost added when the route ends there}
+        weight: Edge attribute name or weight callable
+        heuristic: node -> lower bound on the remaining cost, None for plain Dijkstra
+        stats: Filled with the number of settled nodes when given
+
+    Returns:
+        (total cost, node path), or (inf, None) if no target is reachable
+    """
+    weight_fn = weight_function(graph, weight)
+    estimate = heuristic or (lambda node: 0)
+    adj = graph._adj
+    dist: Dict[Hashable, float] = {}
+    pred: Dict[Hashable, Optional[Hashable]] = {}
+    seen = {}
+    tie = count()
+    heap = []
+    for node, cost in sources.items():
+        if cost < seen.get(node, float("inf")):
+            seen[node] = cost
+            pred[node] = None
+            heapq.heappush(heap, (cost + estimate(node), next(tie), cost, node))
+
+    best_cost, best_target = float("inf"), None
+    while heap:
+        f, _, d, node = heapq.heappop(heap)
+        if node in dist:
+            continue
+        if f >= best_cost:
+            break
+        dist[node] = d
+        if node in targets and d + targets[node] < best_cost:
+            best_cost, best_target = d + targets[node], node
+
+        for neighbor, edge_data in adj[node].items():
+            if neighbor in dist:
+                continue
+            cost = weight_fn(node, neighbor, edge_data)
+            if cost is None:
+                continue
+            new_d = d + cost
+            if new_d < seen.get(neighbor, float("inf")):
+                seen[neighbor] = new_d
+                pred[neighbor] = node
+                heapq.heappush(heap, (new_d + estimate(neighbor), next(tie), new_d, neighbor))
+
+    if stats is not None:
+        stats["settled"] = len(dist)
+    if best_target is None:
+        return float("inf"), None
+
+    path = [best_target]
+    while pred[path[-1]] is not None:
+        path.append(pred[path[-1]])
+    path.reverse()
+    return best_cost, path
+
+
+def bounded_dijkstra(
+        graph: nx.MultiDiGraph,
+        sources: Dict[Hashable, float],
+        cutoff: float,
+        weight: Weight = "length"
+) -> Dict[Hashable, float]:
+    """
+    Costs of every node reachable within cutoff, from one search.
+
+    Args:
+        graph: Road graph
+        sources: {node: initial cost}
+        cutoff: Largest cost to settle
+        weight: Edge attribute name or weight callable
+
+    Returns:
+        {node: cost} for all settled nodes
+    """
+    weight_fn = weight_function(graph, weight)
+    adj = graph._adj
+    dist: Dict[Hashable, float] = {}
+    seen = {}
+    tie = count()
+    heap = []
+    for node, cost in sources.items():
+        if cost <= cutoff and cost < seen.get(node, float("inf")):
+            seen[node] = cost
+            heapq.heappush(heap, (cost, next(tie), node))
+
+    while heap:
+        d, _, node = heapq.heappop(heap)
+        if node in dist:
+            continue
+        dist[node] = d
+
+        for neighbor, edge_data in adj[node].items():
+            if neighbor in dist:
+                continue
+            cost = weight_fn(node, neighbor, edge_data)
+            if cost is None:
+                continue
+            new_d = d + cost
+            if new_d <= cutoff and new_d < seen.get(neighbor, float("inf")):
+                seen[neighbor] = new_d
+                heapq.heappush(heap, (new_d, next(tie), neighbor))
+
+    return dist
+
+
+class ShortestPathTree:
+    """
+    Forward Dijkstra from fixed sources that answers many targets and resumes where it stopped.
+
+    Nodes settled by earlier queries keep their final cost and predecessor,
+    so a target inside the settled area is answered by walking the tree back,
+    and a target beyond it only settles the nodes between the old frontier
+    and the target. Costs must not change while the tree is in use.
+
+    Args:
+        graph: Road graph
+        sources: {node: initial cost}
+        weight: Edge attribute name or weight callable
+    """
+
+    def __init__(self, graph: nx.MultiDiGraph, sources: Dict[Hashable, float], weight: Weight = "length"):
+        self.weight = weight
+        self._weight_fn = weight_function(graph, weight)
+        self._adj = graph._adj
+        self.dist: Dict[Hashable, float] = {}
+        self.pred: Dict[Hashable, Optional[Hashable]] = {}
+        self._seen: Dict[Hashable, float] = {}
+        self._tie = count()
+        self._heap = []
+        for node, cost in sources.items():
+            if cost < self._seen.get(node, float("inf")):
+                self._seen[node] = cost
+                self.pred[node] = None
+                heapq.heappush(self._heap, (cost, next(self._tie), node))
+
+    def frontier(self) -> float:
+        """Cost of the next node to settle, inf once everything reachable is settled."""
+        heap = self._heap
+        while heap and heap[0][2] in self.dist:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else float("inf")
+
+    def _settle_next(self) -> Tuple[Hashable, float]:
+        """Settle the frontier node and relax its edges; the caller checks frontier() first."""
+        d, _, node = heapq.heappop(self._heap)
+        self.dist[node] = d
+        seen, dist = self._seen, self.dist
+        for neighbor, edge_data in self._adj[node].items():
+            if neighbor in dist:
+                continue
+            cost = self._weight_fn(node, neighbor, edge_data)
+            if cost is None:
+                continue
+            new_d = d + cost
+            if new_d < seen.get(neighbor, float("inf")):
+                seen[neighbor] = new_d
+                self.pred[neighbor] = node
+                heapq.heappush(self._heap, (new_d, next(self._tie), neighbor))
+        return node, d
+
+    def query(self, targets: Dict[Hashable, float], stats: Optional[Dict] = None) -> Tuple[float, Optional[List[Hashable]]]:
+        """
+        Cheapest route to any of targets, growing the tree only as far as needed.
+
+        The best target cost is final once the frontier reaches it, as every
+        node not settled yet costs at least the frontier.
+
+        Args:
+            targets: {node: cost added when the route ends there}
+            stats: Filled with the nodes this query settled and the tree size when given
+
+        Returns:
+            (total cost, node path), or (inf, None) if no target is reachable
+        """
+        best_cost, best_target = float("inf"), None
+        for node, offset in targets.items():
+            if node in self.dist and self.dist[node] + offset < best_cost:
+                best_cost, best_target = self.dist[node] + offset, node
+
+        settled = 0
+        while self.frontier() < best_cost:
+            node, d = self._settle_next()
+            settled += 1
+            if node in targets and d + targets[node] < best_cost:
+                best_cost, best_target = d + targets[node], node
+
+        if stats is not None:
+            stats["settled"] = settled
+            stats["tree_nodes"] = len(self.dist)
+        if best_target is None:
+            return float("inf"), None
+
+        path = [best_target]
+        while self.pred[path[-1]] is not None:
+            path.append(self.pred[path[-1]])
+        path.reverse()
+        return best_cost, path
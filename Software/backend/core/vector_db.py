@@ -1,18 +1,22 @@
 from itertools import islice
 import os
+import uuid
 import numpy as np
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any, Optional, Tuple
 
 from qdrant_client import QdrantClient, models
-from qdrant_client.http.models import PointStruct, Filter, FieldCondition, MatchValue
-from geopy.geocoders import Nominatim
+from qdrant_client.http.models import PointStruct
 import networkx as nx
-import folium
-import matplotlib.pyplot as plt
-import osmnx as ox
+from shapely.geometry import mapping
 
-from backend.benchmark import benchmark
+from backend.benchmark import benchmark, stage
+from backend.core.edge_index import EdgeIndex
+from backend.core.geometry import reachability_polygon
+from backend.core.graph_slim import deep_sizeof, graph_fingerprint, graph_sizeof, road_type, slim_graph
+from backend.core.landmarks import LandmarkIndex
+from backend.core.search import ShortestPathTree, bounded_dijkstra, dijkstra_with_offsets
+from backend.core.weight_overlay import EDGE_ID_ATTR, WeightOverlay
 
 def _convert_to_simple_graph(graph: nx.MultiDiGraph) -> nx.DiGraph:
     simple_graph = nx.DiGraph()
@@ -32,27 +36,195 @@ def ensure_routes_dir_exists():
     routes_dir.mkdir(parents=True, exist_ok=True)
     return routes_dir
 
+def save_atomically(path: str, save: Callable[[str], None]):
+    """
+    Write a served map through save() to a per-request file, then move it over path.
+
+    Concurrent requests each write their own file, so the one at path is
+    always complete (the last finished request's), never interleaved writes.
+    """
+    root, ext = os.path.splitext(path)
+    tmp_path = f"{root}.{uuid.uuid4().hex}{ext}"
+    try:
+        save(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
 # Standardized speed limits (Croatian standards)
 SPEED_LIMITS = {
     "motorway": 130, "trunk": 110, "primary": 90, "secondary": 80,
     "tertiary": 70, "residential": 50, "unclassified": 60, "service": 30
 }
 
+# Ideal travel times at the speed limit are scaled by this for "realistic" times,
+# unless the weight overlay has a live speed for the edge
+REALISTIC_FACTOR = 1.3
+
+# Route search metric -> weight overlay cost
+ROUTE_METRICS = {"distance": "length", "time": "time"}
+
+# Payload fields that queries filter on, indexed per collection
+NODE_PAYLOAD_INDEXES = {"name": models.PayloadSchemaType.KEYWORD}
+EDGE_PAYLOAD_INDEXES = {
+    "highway": models.PayloadSchemaType.KEYWORD,
+    "speed_limit": models.PayloadSchemaType.INTEGER,
+    "u": models.PayloadSchemaType.INTEGER,
+    "v": models.PayloadSchemaType.INTEGER,
+}
+
+UPSERT_BATCH_SIZE = 2048
+SCROLL_BATCH_SIZE = 10000
+
 class VectorDatabase:
-    def __init__(self, vector_size: int = 64):
-        self.client = QdrantClient(":memory:")
+    """
+    Qdrant-backed index of a road graph with separate node and edge collections.
+
+    Args:
+        vector_size: Embedding dimension
+        storage_path: Directory for an on-disk local Qdrant, in-memory when None
+        url: Qdrant server URL, takes precedence over storage_path
+        collection_prefix: Collections are named <prefix>_nodes and <prefix>_edges, and
+            <prefix>_meta records the fingerprint of the graph they were built from
+        hnsw: HnswConfigDiff fields, e.g. {"m": 16, "ef_construct": 100}
+        quantization: "scalar" for int8 scalar quantization, None to disable
+        on_disk: Keep original vectors on disk instead of RAM
+        hnsw_ef: Search-time beam width
+        landmarks: Landmarks for ALT distance bounds, stored as <prefix>_landmarks; 0 disables A*
+        slim: Strip the graph to the attributes routing needs (see slim_graph)
+    """
+
+    def __init__(self, vector_size: int = 64, storage_path: Optional[str] = None, url: Optional[str] = None,
+                 collection_prefix: str = "road_network", hnsw: Optional[Dict[str, int]] = None,
+                 quantization: Optional[str] = None, on_disk: bool = False, hnsw_ef: Optional[int] = None,
+                 landmarks: int = 8, slim: bool = True):
+        self.remote = bool(url)
+        if url:
+            self.client = QdrantClient(url=url)
+        elif storage_path:
+            self.client = QdrantClient(path=storage_path)
+        else:
+            self.client = QdrantClient(":memory:")
         self.vector_size = vector_size
-        self.collection_name = "road_network"
-        self.geolocator = Nominatim(user_agent="vector_routing")
+        self.node_collection = f"{collection_prefix}_nodes"
+        self.edge_collection = f"{collection_prefix}_edges"
+        self.landmark_collection = f"{collection_prefix}_landmarks"
+        self.meta_collection = f"{collection_prefix}_meta"
+        self.landmark_count = landmarks
+        self.hnsw = hnsw
+        self.quantization = quantization
+        self.on_disk = on_disk
+        self.search_params = models.SearchParams(
+            hnsw_ef=hnsw_ef,
+            quantization=models.QuantizationSearchParams(rescore=True) if quantization else None
+        )
+        self._geolocator = None
         self.graph = None 
-        
-        self.client.recreate_collection(
-            collection_name=self.collection_name,
-            vectors_config=models.VectorParams(
-                size=self.vector_size,
-                distance=models.Distance.COSINE
+        self.fingerprint: Optional[str] = None
+        self.edge_index = None
+        self.overlay = None
+        self.landmark_index = None
+        self.slim = slim
+        self._simple_graph = None
+
+        self._ensure_collection(self.node_collection, NODE_PAYLOAD_INDEXES)
+        self._ensure_collection(self.edge_collection, EDGE_PAYLOAD_INDEXES)
+
+    def _ensure_collection(self, name: str, payload_indexes: Dict[str, models.PayloadSchemaType],
+                           size: Optional[int] = None, distance: models.Distance = models.Distance.COSINE):
+        # Existing collections are kept so on-disk embeddings survive restarts
+        if self.client.collection_exists(name):
+            return
+
+        quantization_config = None
+        if self.quantization == "scalar":
+            quantization_config = models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, always_ram=True)
             )
+
+        self.client.create_collection(
+            collection_name=name,
+            vectors_config=models.VectorParams(
+                size=size or self.vector_size,
+                distance=distance,
+                on_disk=self.on_disk or None
+            ),
+            hnsw_config=models.HnswConfigDiff(**self.hnsw) if self.hnsw else None,
+            quantization_config=quantization_config
         )
+        # Local Qdrant scans payloads directly and ignores indexes
+        if not self.remote:
+            return
+        for field, schema in payload_indexes.items():
+            self.client.create_payload_index(collection_name=name, field_name=field, field_schema=schema)
+
+    def _read_meta(self) -> Dict[str, Any]:
+        if not self.client.collection_exists(self.meta_collection):
+            return {}
+        points = self.client.retrieve(self.meta_collection, ids=[0])
+        return dict(points[0].payload) if points else {}
+
+    def _write_meta(self, **fields):
+        # qdrant-client 1.14 has no collection metadata, so one point carries it
+        self._ensure_collection(self.meta_collection, {}, size=1)
+        meta = {**self._read_meta(), **fields}
+        self.client.upsert(self.meta_collection, [PointStruct(id=0, vector=[1.0], payload=meta)])
+
+    def _clear_collections(self):
+        """Drop every stored point, e.g. ones embedded from a different graph."""
+        for name in (self.node_collection, self.edge_collection, self.landmark_collection, self.meta_collection):
+            if self.client.collection_exists(name):
+                self.client.delete_collection(name)
+        self._ensure_collection(self.node_collection, NODE_PAYLOAD_INDEXES)
+        self._ensure_collection(self.edge_collection, EDGE_PAYLOAD_INDEXES)
+
+    def _upsert(self, collection_name: str, points: List[PointStruct]):
+        for start in range(0, len(points), UPSERT_BATCH_SIZE):
+            self.client.upsert(collection_name=collection_name, points=points[start:start + UPSERT_BATCH_SIZE])
+
+    def _nearest_nodes(self, coords, limit: int, exact: bool = False):
+        query_vector = self._coords_to_vector(coords[0], coords[1])
+        search_params = models.SearchParams(exact=True) if exact else self.search_params
+        return self.client.search(
+            collection_name=self.node_collection,
+            query_vector=query_vector,
+            search_params=search_params,
+            limit=limit
+        )
+
+    @property
+    def geolocator(self):
+        """Nominatim client, created on first use so geopy stays out of startup."""
+        if self._geolocator is None:
+            from geopy.geocoders import Nominatim
+            self._geolocator = Nominatim(user_agent="vector_routing")
+        return self._geolocator
+
+    def close(self):
+        self.client.close()
+
+    def memory_report(self) -> Dict[str, Any]:
+        """Approximate MB held by the graph and each in-memory index (Qdrant storage not included)."""
+        mb = lambda size: round(size / 1024 ** 2, 2)
+        report = {
+            "graph_mb": mb(graph_sizeof(self.graph)) if self.graph is not None else None,
+            "simple_graph_mb": mb(graph_sizeof(self._simple_graph)) if self._simple_graph is not None else None,
+            "slimmed": self.slim,
+        }
+        if self.edge_index is not None:
+            report["edge_index_mb"] = mb(deep_sizeof([self.edge_index.edges, list(self.edge_index.geometries)]))
+        if self.overlay is not None:
+            report["overlay_mb"] = mb(deep_sizeof([
+                self.overlay.length_m, self.overlay.limit_kmh, self.overlay.live_kmh, self.overlay.closed,
+                self.overlay.length_cost, self.overlay.time_cost, self.overlay.edge_ids
+            ]))
+        if self.landmark_index is not None:
+            report["landmarks_mb"] = mb(
+                self.landmark_index.vectors.nbytes + self.landmark_index.bounds.nbytes
+                + deep_sizeof([self.landmark_index.nodes, self.landmark_index.rows])
+            )
+        return report
 
     def _coords_to_vector(self, lat: float, lon: float) -> List[float]:
         return [
@@ -64,16 +236,37 @@ class VectorDatabase:
     @benchmark()
     def create_embeddings(self, graph: nx.MultiDiGraph):
         self.graph = graph
-        points = []
+        self._simple_graph = None
+        if self.slim:
+            # Tags go before the edge index is built, geometries after it has projected its own copies
+            slim_graph(graph, keep_geometry=True)
+        self.edge_index = EdgeIndex(graph)
+        if self.slim:
+            slim_graph(graph)
+        self.overlay = WeightOverlay(graph, SPEED_LIMITS, REALISTIC_FACTOR)
+        self.fingerprint = graph_fingerprint(graph)
+        meta = self._read_meta()
+        if meta.get("fingerprint") != self.fingerprint:
+            # Also drops points stored without a fingerprint, which cannot be matched to a graph
+            if meta:
+                print(f"Stored embeddings in '{self.node_collection}' are from another graph, rebuilding")
+            self._clear_collections()
+            meta = {}
+        self.landmark_index = self._init_landmarks(graph, meta)
+        if meta.get("fingerprint") == self.fingerprint:
+            print(f"Reusing stored embeddings in '{self.node_collection}' and '{self.edge_collection}'")
+            return
+
+        node_points = []
+        edge_points = []
 
         # Node embeddings
         for node, data in graph.nodes(data=True):
             vector = self._coords_to_vector(data['y'], data['x'])
-            points.append(PointStruct(
+            node_points.append(PointStruct(
                 id=node,
                 vector=vector,
                 payload={
-                    "type": "node",
                     "lat": data['y'],
                     "lon": data['x'],
                     "name": data.get('name', "")
@@ -81,24 +274,20 @@ class VectorDatabase:
             ))
         
         # Edge embeddings
-        edge_id = len(graph.nodes()) + 1  
-        for u, v, data in graph.edges(data=True):
+        for edge_id, (u, v, data) in enumerate(graph.edges(data=True)):
             u_data = graph.nodes[u]
             v_data = graph.nodes[v]
-            highway_type = data.get('highway', 'unclassified')
-            if isinstance(highway_type, list):
-                highway_type = highway_type[0]
+            highway_type = road_type(data)
                 
             edge_vec = self._coords_to_vector(
                 (u_data['y'] + v_data['y'])/2,
                 (u_data['x'] + v_data['x'])/2
             )
             
-            points.append(PointStruct(
+            edge_points.append(PointStruct(
                 id=edge_id,
                 vector=edge_vec,
                 payload={
-                    "type": "edge",
                     "u": u,
                     "v": v,
                     "length": data.get('length', 0),
@@ -106,109 +295,304 @@ class VectorDatabase:
                     "speed_limit": SPEED_LIMITS.get(highway_type, 50)
                 }
             ))
-            edge_id += 1
 
-        self.client.upsert(collection_name=self.collection_name, points=points)
+        self._upsert(self.node_collection, node_points)
+        self._upsert(self.edge_collection, edge_points)
+        # Written last, so an interrupted build is not mistaken for a complete one
+        self._write_meta(fingerprint=self.fingerprint)
+
+    def _init_landmarks(self, graph: nx.MultiDiGraph, meta: Dict[str, Any]) -> Optional[LandmarkIndex]:
+        """Landmark vectors from the landmark collection, computed and stored when missing or stale."""
+        if not self.landmark_count:
+            return None
+        size = 2 * min(self.landmark_count, graph.number_of_nodes())
+        stored_key = f"{self.fingerprint}:{self.landmark_count}"
+        if meta.get("landmarks") == stored_key and self.client.collection_exists(self.landmark_collection):
+            nodes, vectors, ranked = [], [], {}
+            offset = None
+            while True:
+                records, offset = self.client.scroll(
+                    self.landmark_collection, limit=SCROLL_BATCH_SIZE, offset=offset, with_vectors=True
+                )
+                for record in records:
+                    if "landmark_rank" in record.payload:
+                        ranked[record.payload["landmark_rank"]] = record.id
+                    nodes.append(record.id)
+                    vectors.append(record.vector)
+                if offset is None:
+                    break
+            # Unreachable distances are stored as -1, Qdrant vectors must be finite
+            vectors = np.array(vectors)
+            vectors[vectors < 0] = np.inf
+            print(f"Reusing stored landmark vectors in '{self.landmark_collection}'")
+            return LandmarkIndex(nodes, [ranked[i] for i in sorted(ranked)], vectors)
+
+        if self.client.collection_exists(self.landmark_collection):
+            self.client.delete_collection(self.landmark_collection)
+        self._ensure_collection(self.landmark_collection, {}, size=size, distance=models.Distance.EUCLID)
+
+        index = LandmarkIndex.build(graph, self.landmark_count)
+        ranks = {node: i for i, node in enumerate(index.landmarks)}
+        stored = np.where(np.isfinite(index.vectors), index.vectors, -1)
+        self._upsert(self.landmark_collection, [
+            PointStruct(
+                id=node,
+                vector=stored[row].tolist(),
+                payload={"landmark_rank": ranks[node]} if node in ranks else {}
+            )
+            for row, node in enumerate(index.nodes)
+        ])
+        self._write_meta(landmarks=stored_key)
+        print(f"Built {len(index.landmarks)} landmarks in {index.build_seconds:.2f} seconds")
+        return index
+
+    def similar_nodes(self, node: int, limit: int = 10) -> List[Dict[str, Any]]:
+        """Nodes with the closest landmark vectors, i.e. a similar position in the road network."""
+        vector = self.landmark_index.vector(node) if self.landmark_index else None
+        if vector is None:
+            return []
+        hits = self.client.search(
+            collection_name=self.landmark_collection,
+            query_vector=np.where(np.isfinite(vector), vector, -1).tolist(),
+            limit=limit + 1
+        )
+        return [{"node": hit.id, "distance": hit.score} for hit in hits if hit.id != node][:limit]
+
+    def _heuristic(self, targets, metric: str):
+        if self.landmark_index is None:
+            return None
+        if metric == "time":
+            # Seconds can be no less than meters at the top speed anywhere in the region
+            return self.landmark_index.heuristic(targets, scale=3.6 / self.overlay.top_speed_kmh())
+        return self.landmark_index.heuristic(targets)
+
+    def _route_from_edge_snaps(self, source_coords, dest_coords, metric: str = "distance",
+                               use_landmarks: bool = True, stats: Optional[Dict] = None):
+        """Shortest path between the positions on the nearest edges, not the nearest nodes."""
+        weight = self.overlay.weight(ROUTE_METRICS[metric])
+        src, dst = self.edge_index.snap_many([source_coords, dest_coords], weight=weight)
+        targets = self.edge_index.target_offsets(dst, weight=weight)
+        cost, path = dijkstra_with_offsets(
+            self.graph,
+            self.edge_index.source_offsets(src, weight=weight),
+            targets,
+            weight=weight,
+            heuristic=self._heuristic(targets, metric) if use_landmarks else None,
+            stats=stats
+        )
+
+        direct = self._direct_cost(src, dst, weight)
+        if direct is not None and direct <= cost:
+            return [], src, dst
+        return path, src, dst
+
+    def _direct_cost(self, src: Dict, dst: Dict, weight) -> Optional[float]:
+        """Cost of driving straight along the road both snaps are on, None if they are not or it is closed."""
+        # Both points on the same road: driving along it directly may beat any detour
+        if {src["u"], src["v"]} != {dst["u"], dst["v"]}:
+            return None
+        u, v = src["u"], src["v"]
+        dst_fraction = dst["fraction"] if dst["u"] == u else 1 - dst["fraction"]
+        if dst_fraction >= src["fraction"]:
+            edge_cost = weight(u, v, {src["key"]: self.graph[u][v][src["key"]]})
+        elif self.graph.has_edge(v, u):
+            # The weight takes the cheapest of parallel reverse edges
+            edge_cost = weight(v, u, self.graph[v][u])
+        else:
+            edge_cost = None
+        return None if edge_cost is None else abs(dst_fraction - src["fraction"]) * edge_cost
+
+    def route_tree(self, source_coords, metric: str = "distance") -> Tuple[ShortestPathTree, Dict]:
+        """
+        Shortest-path tree from the position on the road nearest to source_coords.
+
+        The tree is grown lazily by route_from_tree and stays valid while
+        overlay.version is unchanged.
+
+        Returns:
+            (tree, source snap)
+        """
+        weight = self.overlay.weight(ROUTE_METRICS[metric])
+        src = self.edge_index.snap(*source_coords, weight=weight)
+        return ShortestPathTree(self.graph, self.edge_index.source_offsets(src, weight=weight), weight=weight), src
+
+    def route_from_tree(self, tree: ShortestPathTree, src: Dict, dest_coords, metric: str = "distance",
+                        stats: Optional[Dict] = None) -> Dict[str, Any]:
+        """
+        Route from a route_tree source to dest_coords, without rendering maps.
+
+        Returns:
+            Same fields as find_optimal_route except visualizations, or {"error": ...}
+        """
+        dst = self.edge_index.snap(*dest_coords, weight=tree.weight)
+        cost, path = tree.query(self.edge_index.target_offsets(dst, weight=tree.weight), stats=stats)
+        direct = self._direct_cost(src, dst, tree.weight)
+        if direct is not None and direct <= cost:
+            path = []
+        if path is None:
+            return {"error": "No path found between the nearest road segments"}
+        return self._route_result(path, metric, src, dst)
+
+    def _partial_leg(self, snap, node, leaving: bool, costs: Optional[np.ndarray] = None):
+        """
+        Edge data and length of the piece between a snapped position and an adjacent path node.
+
+        Against the snapped edge's direction the cheapest reverse edge under
+        costs (overlay cost array, lengths when None) is used.
+        """
+        u, v, fraction = snap["u"], snap["v"], snap["fraction"]
+        forward = self.graph[u][v][snap["key"]]
+        length = forward.get('length', 0)
+        # Leaving towards v or arriving from u drives along u -> v, otherwise along v -> u
+        if node == (v if leaving else u):
+            return forward, ((1 - fraction) if leaving else fraction) * length
+        if self.graph.has_edge(v, u):
+            key = (lambda data: costs[data[EDGE_ID_ATTR]]) if costs is not None else (lambda data: data.get('length', 0))
+            reverse = min(self.graph[v][u].values(), key=key)
+        else:
+            reverse = forward
+        return reverse, (fraction if leaving else (1 - fraction)) * length
+
+    def _leg_details(self, legs):
+        """Distance, ideal and realistic minutes and per-leg details of (from, to, edge_data, length_m) legs."""
+        total_distance = 0
+        ideal_time_min = 0
+        realistic_time_min = 0
+        path_details = []
+
+        for u, v, edge_data, length_m in legs:
+            total_distance += length_m
+
+            edge_road_type = road_type(edge_data)
+            speed_kmh = SPEED_LIMITS.get(edge_road_type, 50)
+            edge_km = length_m / 1000
+            ideal_time_min += (edge_km / speed_kmh) * 60
+            detail = {
+                "from": u,
+                "to": v,
+                "length_m": length_m,
+                "road_type": edge_road_type,
+                "speed_kmh": speed_kmh
+            }
+
+            eid = edge_data.get(EDGE_ID_ATTR)
+            if eid is None:
+                realistic_time_min += (edge_km / speed_kmh) * 60 * REALISTIC_FACTOR
+            else:
+                realistic_time_min += (edge_km / self.overlay.speed_kmh(eid)) * 60
+                if not np.isnan(self.overlay.live_kmh[eid]):
+                    detail["live_speed_kmh"] = float(self.overlay.live_kmh[eid])
+            path_details.append(detail)
+
+        return total_distance, ideal_time_min, realistic_time_min, path_details
+
+    def _route_result(self, path, metric: str, src: Optional[Dict] = None, dst: Optional[Dict] = None) -> Dict[str, Any]:
+        """Distance, times, waypoints and per-leg details of a node path, between edge snaps when given."""
+        legs = []
+        costs = self.overlay.time_cost if metric == "time" else self.overlay.length_cost
+        if src is not None and path:
+            legs.append(("start", path[0], *self._partial_leg(src, path[0], leaving=True, costs=costs)))
+
+        for u, v in zip(path[:-1], path[1:]):
+            edge_data = min(self.graph[u][v].values(), key=lambda data: costs[data[EDGE_ID_ATTR]])
+            legs.append((u, v, edge_data, edge_data.get('length', 0)))
+
+        if dst is not None:
+            if path:
+                legs.append((path[-1], "end", *self._partial_leg(dst, path[-1], leaving=False, costs=costs)))
+            else:
+                edge_data = self.graph[src["u"]][src["v"]][src["key"]]
+                dst_fraction = dst["fraction"] if dst["u"] == src["u"] else 1 - dst["fraction"]
+                legs.append(("start", "end", edge_data, abs(dst_fraction - src["fraction"]) * edge_data.get('length', 0)))
+
+        total_distance, ideal_time_min, realistic_time_min, path_details = self._leg_details(legs)
+
+        waypoints = [[self.graph.nodes[n]['y'], self.graph.nodes[n]['x']] for n in path]
+        if src is not None:
+            waypoints = [[src["lat"], src["lon"]]] + waypoints + [[dst["lat"], dst["lon"]]]
+
+        return {
+            "path": path,
+            "distance_km": total_distance / 1000,
+            "ideal_time_min": ideal_time_min,
+            "realistic_time_min": realistic_time_min,
+            "average_speed_kmh": (total_distance / 1000) / (realistic_time_min / 60) if realistic_time_min else 0,
+            "waypoints": waypoints,
+            "path_details": path_details,
+        }
 
     @benchmark()
-    def find_optimal_route(self, source_coords, dest_coords, k: int = 3):
+    def find_optimal_route(self, source_coords, dest_coords, k: int = 3, snap: str = "edge",
+                           metric: str = "distance", render_maps: bool = True):
         try:
-            source_vec = self._coords_to_vector(source_coords[0], source_coords[1])
-            dest_vec = self._coords_to_vector(dest_coords[0], dest_coords[1])
-            
-            source_nodes = self.client.search(
-                collection_name=self.collection_name,
-                query_vector=source_vec,
-                query_filter=Filter(
-                    must=[FieldCondition(key="type", match=MatchValue(value="node"))]
-                ),
-                limit=k
-            )
-            
-            dest_nodes = self.client.search(
-                collection_name=self.collection_name,
-                query_vector=dest_vec,
-                query_filter=Filter(
-                    must=[FieldCondition(key="type", match=MatchValue(value="node"))]
-                ),
-                limit=k
-            )
-            
-            best_path = None
-            min_length = float('inf')
-            
-            for src_node in source_nodes:
-                for dst_node in dest_nodes:
-                    if nx.has_path(self.graph, src_node.id, dst_node.id):
-                        path = nx.shortest_path(
-                            self.graph, 
-                            source=src_node.id, 
-                            target=dst_node.id, 
-                            weight='length'
-                        )
-                        path_length = sum(
-                            self.graph[u][v][0]['length'] 
-                            for u,v in zip(path[:-1], path[1:])
-                        )
-
-                        if path_length < min_length:
-                            min_length = path_length
-                            best_path = path
-            
-            if not best_path:
-                return {"error": "No path found between nearest vector nodes"}
-            
-            total_distance = 0
-            ideal_time_min = 0
-            path_details = []
-            
-            for u, v in zip(best_path[:-1], best_path[1:]):
-                edge_data = self.graph[u][v][0]
-                length_m = edge_data.get('length', 0)
-                total_distance += length_m
+            if snap == "edge":
+                best_path, src, dst = self._route_from_edge_snaps(source_coords, dest_coords, metric)
+                if best_path is None:
+                    return {"error": "No path found between the nearest road segments"}
+            else:
+                src = dst = None
+                source_nodes = self._nearest_nodes(source_coords, limit=k)
+                dest_nodes = self._nearest_nodes(dest_coords, limit=k)
                 
-                road_type = edge_data.get('highway', 'unclassified')
-                if isinstance(road_type, list):
-                    road_type = road_type[0]
+                best_path = None
+                min_length = float('inf')
+                weight = self.overlay.weight(ROUTE_METRICS[metric])
                 
-                speed_kmh = SPEED_LIMITS.get(road_type, 50)
-                edge_km = length_m / 1000
-                ideal_time_min += (edge_km / speed_kmh) * 60
-                path_details.append({
-                    "from": u,
-                    "to": v,
-                    "length_m": length_m,
-                    "road_type": road_type,
-                    "speed_kmh": speed_kmh
-                })
-            
-            waypoints = [[self.graph.nodes[n]['y'], self.graph.nodes[n]['x']] for n in best_path]
+                for src_node in source_nodes:
+                    for dst_node in dest_nodes:
+                        if nx.has_path(self.graph, src_node.id, dst_node.id):
+                            try:
+                                path = nx.shortest_path(
+                                    self.graph, 
+                                    source=src_node.id, 
+                                    target=dst_node.id, 
+                                    weight=weight
+                                )
+                            except nx.NetworkXNoPath:
+                                # Only connected through closed roads
+                                continue
+                            path_length = sum(
+                                weight(u, v, self.graph[u][v])
+                                for u,v in zip(path[:-1], path[1:])
+                            )
+
+                            if path_length < min_length:
+                                min_length = path_length
+                                best_path = path
+                
+                if not best_path:
+                    return {"error": "No path found between nearest vector nodes"}
+
+            result = self._route_result(best_path, metric, src, dst)
+            if not render_maps:
+                return {**result, "visualizations": {}}
+
+            waypoints = result["waypoints"]
             output_dir = ensure_routes_dir_exists()
             
             plot_path = os.path.join(output_dir, "route_static_DB.png")
-            fig, ax = ox.plot_graph_route(
-                self.graph, best_path,
-                route_linewidth=6, node_size=0, bgcolor='white',
-                show=False, close=True
-            )
-            fig.savefig(plot_path, dpi=300, bbox_inches='tight')
-            plt.close(fig)
-            
             map_path = os.path.join(output_dir, "route_map_DB.html")
-            m = folium.Map(location=source_coords, zoom_start=13)
-            folium.PolyLine(waypoints, color='blue', weight=5, opacity=0.7).add_to(m)
-            folium.Marker(waypoints[0], popup="Start", icon=folium.Icon(color='green')).add_to(m)
-            folium.Marker(waypoints[-1], popup="End", icon=folium.Icon(color='red')).add_to(m)
-            m.save(map_path)
+            with stage("render_maps"):
+                import folium
+                if len(best_path) > 1:
+                    import matplotlib.pyplot as plt
+                    import osmnx as ox
+                    fig, ax = ox.plot_graph_route(
+                        self.graph, best_path,
+                        route_linewidth=6, node_size=0, bgcolor='white',
+                        show=False, close=True
+                    )
+                    save_atomically(plot_path, lambda path: fig.savefig(path, dpi=300, bbox_inches='tight'))
+                    plt.close(fig)
+                
+                m = folium.Map(location=source_coords, zoom_start=13)
+                folium.PolyLine(waypoints, color='blue', weight=5, opacity=0.7).add_to(m)
+                folium.Marker(waypoints[0], popup="Start", icon=folium.Icon(color='green')).add_to(m)
+                folium.Marker(waypoints[-1], popup="End", icon=folium.Icon(color='red')).add_to(m)
+                save_atomically(map_path, m.save)
             
             return {
-                "path": best_path,
-                "distance_km": total_distance / 1000,
-                "ideal_time_min": ideal_time_min,
-                "realistic_time_min": ideal_time_min * 1.3,
-                "average_speed_kmh": (total_distance / 1000) / ((ideal_time_min * 1.3) / 60),
-                "waypoints": waypoints,
-                "path_details": path_details,
+                **result,
                 "visualizations": {
                     "static_map": plot_path,
                     "interactive_map": map_path
@@ -219,101 +603,122 @@ class VectorDatabase:
             return {"error": f"Routing failed: {str(e)}"}
 
     @benchmark()
-    def find_alternative_routes(self, source_coords, dest_coords, k: int = 3, n_routes: int = 3):
+    def find_alternative_routes(self, source_coords, dest_coords, n_routes: int = 3, render_maps: bool = True):
+        """
+        Up to n_routes shortest loopless routes between the same road positions /optimal snaps to.
+
+        Candidates run from the nodes the source snap can leave towards to
+        the nodes the destination snap can be reached from, plus driving
+        straight along the road when both points are on it, and are ranked
+        by their full length including the partial edges at both ends.
+        """
         try:
-            source_vec = self._coords_to_vector(source_coords[0], source_coords[1])
-            dest_vec = self._coords_to_vector(dest_coords[0], dest_coords[1])
-            
-            source_nodes = self.client.search(
-                collection_name=self.collection_name,
-                query_vector=source_vec,
-                query_filter=Filter(
-                    must=[FieldCondition(key="type", match=MatchValue(value="node"))]
-                ),
-                limit=k*2
-            )
-            
-            dest_nodes = self.client.search(
-                collection_name=self.collection_name,
-                query_vector=dest_vec,
-                query_filter=Filter(
-                    must=[FieldCondition(key="type", match=MatchValue(value="node"))]
-                ),
-                limit=k*2
-            )
-            
+            # The graph never changes once loaded (live weights are in the overlay), so convert it once
+            if self._simple_graph is None:
+                self._simple_graph = _convert_to_simple_graph(self.graph)
+            simplified_graph = self._simple_graph
+            weight = self.overlay.weight("length", multigraph=False)
+            multi_weight = self.overlay.weight("length")
+
+            src, dst = self.edge_index.snap_many([source_coords, dest_coords], weight=multi_weight)
+            candidates = []
+            direct = self._direct_cost(src, dst, multi_weight)
+            if direct is not None:
+                candidates.append((direct, []))
+
+            targets = self.edge_index.target_offsets(dst, weight=multi_weight)
+            for src_node, src_cost in self.edge_index.source_offsets(src, weight=multi_weight).items():
+                for dst_node, dst_cost in targets.items():
+                    try:
+                        for path in islice(nx.shortest_simple_paths(
+                                simplified_graph, source=src_node, target=dst_node, weight=weight), n_routes):
+                            cost = src_cost + dst_cost + sum(
+                                weight(u, v, simplified_graph[u][v]) for u, v in zip(path[:-1], path[1:])
+                            )
+                            candidates.append((cost, path))
+                    except nx.NetworkXNoPath:
+                        # Not connected, or only through closed roads
+                        continue
+
             routes = []
             seen_paths = set()
-            
-            simplified_graph = _convert_to_simple_graph(self.graph)
-            
-            for src_node in source_nodes:
-                for dst_node in dest_nodes:
-                    if len(routes) >= n_routes:
-                        break
-                        
-                    if nx.has_path(simplified_graph, src_node.id, dst_node.id):
-                        paths = list(islice(
-                            nx.shortest_simple_paths(
-                                simplified_graph,
-                                source=src_node.id,
-                                target=dst_node.id,
-                                weight='length'
-                            ),
-                            n_routes
-                        ))
-                        
-                        for path in paths:
-                            path_tuple = tuple(path)
-                            if path_tuple not in seen_paths:
-                                seen_paths.add(path_tuple)
-                                routes.append(path)
-                                if len(routes) >= n_routes:
-                                    break
+            for _, path in sorted(candidates, key=lambda candidate: candidate[0]):
+                if tuple(path) not in seen_paths:
+                    seen_paths.add(tuple(path))
+                    routes.append(path)
+                if len(routes) >= n_routes:
+                    break
             
             if not routes:
                 return {"error": "No alternative routes found"}
             
             results = []
             for i, path in enumerate(routes):
-                total_distance = 0
-                ideal_time_min = 0
-                
-                for u, v in zip(path[:-1], path[1:]):
-                    edge_data = self.graph[u][v][0]
-                    length_m = edge_data.get('length', 0)
-                    total_distance += length_m
-                    
-                    road_type = edge_data.get('highway', 'unclassified')
-                    if isinstance(road_type, list):
-                        road_type = road_type[0]
-                    
-                    speed_kmh = SPEED_LIMITS.get(road_type, 50)
-                    edge_km = length_m / 1000
-                    ideal_time_min += (edge_km / speed_kmh) * 60
-                
-                waypoints = [(self.graph.nodes[n]['y'], self.graph.nodes[n]['x']) for n in path]
-                output_dir = ensure_routes_dir_exists()
-                map_path = os.path.join(output_dir, f"route_alt_{i+1}.html")
-                
-                m = folium.Map(location=source_coords, zoom_start=12)
-                folium.PolyLine(waypoints, color="blue", weight=5, opacity=0.7).add_to(m)
-                folium.Marker(waypoints[0], popup="Start", icon=folium.Icon(color='green')).add_to(m)
-                folium.Marker(waypoints[-1], popup="End", icon=folium.Icon(color='red')).add_to(m)
-                m.save(map_path)
+                result = self._route_result(path, "distance", src, dst)
+                waypoints = result["waypoints"]
+                map_path = None
+                if render_maps:
+                    output_dir = ensure_routes_dir_exists()
+                    map_path = os.path.join(output_dir, f"route_alt_{i+1}.html")
+
+                    with stage("render_maps"):
+                        import folium
+                        m = folium.Map(location=source_coords, zoom_start=12)
+                        folium.PolyLine(waypoints, color="blue", weight=5, opacity=0.7).add_to(m)
+                        folium.Marker(waypoints[0], popup="Start", icon=folium.Icon(color='green')).add_to(m)
+                        folium.Marker(waypoints[-1], popup="End", icon=folium.Icon(color='red')).add_to(m)
+                        save_atomically(map_path, m.save)
                 
-                results.append({
-                    "index": i + 1,
-                    "path": path,
-                    "distance_km": total_distance / 1000,
-                    "ideal_time_min": ideal_time_min,
-                    "realistic_time_min": ideal_time_min * 1.3,
-                    "average_speed_kmh": (total_distance / 1000) / ((ideal_time_min * 1.3) / 60),
-                    "waypoints": waypoints,
-                    "map_html": map_path
-                })
+                results.append({"index": i + 1, **result, "map_html": map_path})
             
             return {"alternatives": results}
             
         except Exception as e:
-            return {"error": f"Alternative routing failed: {str(e)}"}
\ No newline at end of file
+            return {"error": f"Alternative routing failed: {str(e)}"}
+
+    @benchmark()
+    def find_isochrone(self, coords, minutes: List[float], include_nodes: bool = True, hull_ratio: float = 0.3):
+        """
+        Area reachable from a point within each time band, from one bounded Dijkstra.
+
+        Travel times are the realistic times used for routes (live overlay
+        speeds, else the speed limit scaled by REALISTIC_FACTOR). Each band
+        polygon is the concave hull of the nodes reached within it (see
+        reachability_polygon), as GeoJSON.
+        """
+        try:
+            bands = sorted(minutes)
+            travel_time_weight = self.overlay.weight("time")
+            snap = self.edge_index.snap(coords[0], coords[1], weight=travel_time_weight)
+            times_s = bounded_dijkstra(
+                self.graph,
+                self.edge_index.source_offsets(snap, weight=travel_time_weight),
+                cutoff=bands[-1] * 60,
+                weight=travel_time_weight
+            )
+
+            results = []
+            for band in bands:
+                reached = [node for node, t in times_s.items() if t <= band * 60]
+                polygon = reachability_polygon(
+                    [self.graph.nodes[n]['x'] for n in reached],
+                    [self.graph.nodes[n]['y'] for n in reached],
+                    ratio=hull_ratio
+                )
+                band_result = {
+                    "minutes": band,
+                    "node_count": len(reached),
+                    "polygon": mapping(polygon),
+                }
+                if include_nodes:
+                    band_result["nodes"] = reached
+                results.append(band_result)
+
+            return {
+                "center": [snap["lat"], snap["lon"]],
+                "settled_nodes": len(times_s),
+                "bands": results
+            }
+
+        except Exception as e:
+            return {"error": f"Isochrone failed: {str(e)}"}
@@ -0,0 +1,201 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from backend.core.region_registry import (
+    RegionRegistry, cell_to_bbox, HISTORY_CELL_DEG
+)
+from backend.core.route_sessions import route_sessions
+
+DEFAULT_CONFIG_PATH = "backend/config/regions.json"
+
+
+def load_region_config(path: Optional[str] = None) -> Dict:
+    """Read the preload/prefetch config, path overridable with REGIONS_CONFIG."""
+    path = path or os.environ.get("REGIONS_CONFIG", DEFAULT_CONFIG_PATH)
+    if not os.path.exists(path):
+        print(f"No region config at {path}, skipping warm-up")
+        return {"preload": [], "prefetch": {"enabled": False}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_region_graph(entry: Dict):
+    """
+    Load the graph for one preload entry, cheapest source first:
+    GraphML snapshot, then local raw export, then places downloaded from OSM.
+    New graphs are written back to the snapshot path for the next start.
+    osmnx is imported here, on the warm-up thread, rather than at startup.
+    """
+    import osmnx as ox
+    from backend.core.osm_data_loader import fetch_osm_data, load_raw_export
+
+    snapshot = entry.get("snapshot")
+    if snapshot and os.path.exists(snapshot):
+        return ox.load_graphml(snapshot), "snapshot"
+    if entry.get("raw_export"):
+        return load_raw_export(entry["raw_export"], save_to_file=snapshot), "raw_export"
+    if entry.get("places"):
+        graph = fetch_osm_data(entry["places"], save_to_file=snapshot)["graph"]
+        return graph, "download"
+    raise ValueError(f"Region '{entry.get('name')}' has no snapshot, raw_export or places")
+
+
+class WarmupState:
+    def __init__(self):
+        self.pending: List[str] = []
+        self.loaded: List[str] = []
+        self.failed: Dict[str, str] = {}
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.finished_at is not None
+
+    def info(self) -> Dict:
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = round((self.finished_at or time.time()) - self.started_at, 2)
+        return {
+            "ready": self.ready,
+            "pending": list(self.pending),
+            "loaded": list(self.loaded),
+            "failed": dict(self.failed),
+            "elapsed_s": elapsed,
+        }
+
+
+def warm_up(registry: RegionRegistry, config: Dict, state: WarmupState):
+    """Preload every configured region into the registry, recording progress in state."""
+    entries = config.get("preload", [])
+    state.started_at = time.time()
+    state.pending = [entry["name"] for entry in entries]
+
+    for entry in entries:
+        name = entry["name"]
+        try:
+            graph, source = load_region_graph(entry)
+            registry.register(name, graph, source=source, pinned=True)
+            state.loaded.append(name)
+        except Exception as e:
+            print(f"Warm-up of region '{name}' failed: {e}")
+            state.failed[name] = str(e)
+        state.pending.remove(name)
+
+    state.finished_at = time.time()
+    print(f"Warm-up finished in {state.finished_at - state.started_at:.2f} seconds")
+
+
+class RegionPrefetcher(threading.Thread):
+    """
+    Background thread warming regions the request history says will be needed.
+
+    Once the service has been idle for idle_seconds, the most requested
+    history cells that no loaded region covers are downloaded, followed by
+    the neighbours of the busiest cell. At most max_regions are prefetched.
+    """
+
+    def __init__(self, registry: RegionRegistry, idle_seconds: float = 60, interval_seconds: float = 15,
+                 min_requests: int = 2, max_regions: int = 4, cell_deg: float = HISTORY_CELL_DEG):
+        super().__init__(name="region-prefetcher", daemon=True)
+        self.registry = registry
+        self.idle_seconds = idle_seconds
+        self.interval_seconds = interval_seconds
+        self.min_requests = min_requests
+        self.max_regions = max_regions
+        self.cell_deg = cell_deg
+        self.prefetched: List[str] = []
+        self.failed_cells = set()
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def is_idle(self) -> bool:
+        return time.time() - self.registry.last_request_at >= self.idle_seconds
+
+    def next_cell(self):
+        ranked = self.registry.top_cells(self.min_requests)
+        candidates = list(ranked)
+        if ranked:
+            row, col = ranked[0]
+            candidates += [
+                (row + dr, col + dc)
+                for dr in (-1, 0, 1) for dc in (-1, 0, 1) if dr or dc
+            ]
+        for cell in candidates:
+            if cell in self.failed_cells:
+                continue
+            if not self.registry.is_covered(cell_to_bbox(cell, self.cell_deg)):
+                return cell
+        return None
+
+    def prefetch_once(self) -> Optional[str]:
+        cell = self.next_cell()
+        if cell is None:
+            return None
+        name = f"prefetch:{cell[0]}:{cell[1]}"
+        west, south, east, north = cell_to_bbox(cell, self.cell_deg)
+        # Pad by a quarter cell so routes near the cell border stay inside the region
+        pad = self.cell_deg / 4
+        try:
+            from backend.core.osm_data_loader import download_bbox_graph
+            graph = download_bbox_graph((west - pad, south - pad, east + pad, north + pad))
+            # Built while the service is idle, so it can afford landmarks
+            self.registry.register(name, graph, source="prefetch", landmarks=True)
+            self.prefetched.append(name)
+            return name
+        except Exception as e:
+            print(f"Prefetch of cell {cell} failed: {e}")
+            self.failed_cells.add(cell)
+            return None
+
+    def run(self):
+        while not self._stop_event.wait(self.interval_seconds):
+            if len(self.prefetched) >= self.max_regions or not self.is_idle():
+                continue
+            self.prefetch_once()
+
+    def info(self) -> Dict:
+        return {
+            "running": self.is_alive(),
+            "idle": self.is_idle(),
+            "prefetched": list(self.prefetched),
+        }
+
+
+warmup_state = WarmupState()
+prefetcher: Optional[RegionPrefetcher] = None
+
+
+def start_background_warmup(registry: RegionRegistry, config_path: Optional[str] = None) -> threading.Thread:
+    """Run warm-up in a thread so /health/live answers while regions load, then start prefetching."""
+    config = load_region_config(config_path)
+    registry.configure(**config.get("qdrant", {}))
+    removed = registry.prune_storage([entry["name"] for entry in config.get("preload", [])])
+    if removed:
+        print(f"Removed stored embeddings of {len(removed)} regions that are no longer preloaded")
+    route_sessions.configure(**config.get("reroute", {}))
+
+    def run():
+        global prefetcher
+        # Imports osmnx, so it runs here rather than before /health/live answers
+        from backend.core.osm_data_loader import configure_osm
+        configure_osm()
+        warm_up(registry, config, warmup_state)
+        prefetch_config = dict(config.get("prefetch", {}))
+        if prefetch_config.pop("enabled", False):
+            prefetcher = RegionPrefetcher(registry, **prefetch_config)
+            prefetcher.start()
+
+    thread = threading.Thread(target=run, name="region-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def stop_background_warmup():
+    if prefetcher is not None:
+        prefetcher.stop()
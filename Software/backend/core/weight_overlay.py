@@ -0,0 +1,215 @@
+import csv
+import json
+import os
+import time
+from typing import Callable, Dict, Hashable, List, Optional
+
+import networkx as nx
+import numpy as np
+
+from backend.core.graph_slim import road_type
+
+# Edge attribute holding the edge's position in the overlay arrays
+EDGE_ID_ATTR = "eid"
+
+# Traffic feeds are only read from this directory, overridable with TRAFFIC_FEED_DIR
+DEFAULT_TRAFFIC_FEED_DIR = "backend/data/traffic"
+
+
+class WeightOverlay:
+    """
+    Live per-edge speeds and closures on top of a road graph, kept in arrays.
+
+    Every edge gets a position in the arrays, stored on the edge as "eid".
+    Updates only write the positions of the edges they name, so a batch costs
+    O(batch size) whatever the region size, and neither the graph nor its
+    embeddings are rebuilt. Routing reads the current costs through weight().
+
+    Without a live speed an edge is driven at its speed limit slowed down by
+    realistic_factor, a live speed is used as is. Closed edges cost infinity
+    and are hidden from every search.
+    """
+
+    def __init__(self, graph: nx.MultiDiGraph, speed_limits: Dict[str, float],
+                 realistic_factor: float, default_speed: float = 50):
+        count = graph.number_of_edges()
+        self.length_m = np.empty(count)
+        self.limit_kmh = np.empty(count)
+        self.live_kmh = np.full(count, np.nan)
+        self.closed = np.zeros(count, dtype=bool)
+        self.realistic_factor = realistic_factor
+        # (u, v) -> [(key, eid)], parallel edges share a pair
+        self.edge_ids: Dict[tuple, List[tuple]] = {}
+
+        for eid, (u, v, key, data) in enumerate(graph.edges(keys=True, data=True)):
+            data[EDGE_ID_ATTR] = eid
+            self.length_m[eid] = data.get('length', 0)
+            self.limit_kmh[eid] = speed_limits.get(road_type(data), default_speed)
+            self.edge_ids.setdefault((u, v), []).append((key, eid))
+
+        self.length_cost = self.length_m.copy()
+        self.time_cost = np.empty(count)
+        self._recompute(np.arange(count))
+        self.version = 0
+        self.updated_at: Optional[float] = None
+
+    def _recompute(self, eids: np.ndarray):
+        speed_kmh = np.where(np.isnan(self.live_kmh[eids]),
+                             self.limit_kmh[eids] / self.realistic_factor,
+                             self.live_kmh[eids])
+        closed = self.closed[eids]
+        self.length_cost[eids] = np.where(closed, np.inf, self.length_m[eids])
+        self.time_cost[eids] = np.where(closed, np.inf, self.length_m[eids] / (speed_kmh / 3.6))
+
+    def resolve(self, u: Hashable, v: Hashable, key: Optional[Hashable] = None) -> List[int]:
+        """Overlay positions of the u -> v edge with this key, or of all parallel edges when key is None."""
+        return [eid for edge_key, eid in self.edge_ids.get((u, v), ()) if key is None or edge_key == key]
+
+    def apply_arrays(self, eids: np.ndarray, speed_kmh: np.ndarray, closed: np.ndarray):
+        """
+        Apply updates already resolved to overlay positions.
+
+        Args:
+            eids: Overlay positions
+            speed_kmh: Live speed per position, NaN leaves the speed unchanged
+            closed: 1 closes, 0 reopens, -1 leaves the closure unchanged
+        """
+        eids = np.asarray(eids, dtype=np.int64)
+        speed_kmh = np.asarray(speed_kmh, dtype=float)
+        closed = np.asarray(closed, dtype=np.int8)
+
+        has_speed = ~np.isnan(speed_kmh)
+        # A zero or negative speed would give infinite or negative costs, which searches cannot handle
+        if np.any(speed_kmh[has_speed] <= 0):
+            raise ValueError("Live speeds must be positive")
+        self.live_kmh[eids[has_speed]] = speed_kmh[has_speed]
+        has_closure = closed >= 0
+        self.closed[eids[has_closure]] = closed[has_closure].astype(bool)
+        self._recompute(np.unique(eids))
+
+        self.version += 1
+        self.updated_at = time.time()
+
+    def apply_updates(self, updates: List[Dict]) -> Dict:
+        """
+        Apply a batch of {"u", "v", "key"?, "speed_kmh"?, "closed"?} updates.
+
+        Returns:
+            Number of updated edges and of updates naming edges not in this graph
+        """
+        eids, speeds, closures = [], [], []
+        unknown = 0
+        for update in updates:
+            matched = self.resolve(update["u"], update["v"], update.get("key"))
+            if not matched:
+                unknown += 1
+                continue
+            speed = update.get("speed_kmh")
+            closed = update.get("closed")
+            for eid in matched:
+                eids.append(eid)
+                speeds.append(np.nan if speed is None else speed)
+                closures.append(-1 if closed is None else int(closed))
+
+        if eids:
+            self.apply_arrays(np.array(eids), np.array(speeds), np.array(closures))
+        return {"updated_edges": len(eids), "unknown": unknown, "version": self.version}
+
+    def reset(self):
+        """Drop every live speed and closure."""
+        self.live_kmh[:] = np.nan
+        self.closed[:] = False
+        self._recompute(np.arange(len(self.length_m)))
+        self.version += 1
+        self.updated_at = time.time()
+
+    def weight(self, metric: str = "length", multigraph: bool = True) -> Callable:
+        """
+        Weight callable over the current costs, for dijkstra_with_offsets and networkx.
+
+        Args:
+            metric: "length" (meters) or "time" (realistic seconds)
+            multigraph: False for simple graphs, whose edge data is a single attribute dict
+        """
+        # The cost arrays are updated in place, so the closure always sees the latest values
+        costs = self.time_cost if metric == "time" else self.length_cost
+        inf = np.inf
+
+        if not multigraph:
+            def simple_weight(u, v, data):
+                cost = costs[data[EDGE_ID_ATTR]]
+                return None if cost == inf else cost
+            return simple_weight
+
+        def multi_weight(u, v, edge_data):
+            if len(edge_data) == 1:
+                cost = costs[next(iter(edge_data.values()))[EDGE_ID_ATTR]]
+            else:
+                cost = min(costs[data[EDGE_ID_ATTR]] for data in edge_data.values())
+            return None if cost == inf else cost
+        return multi_weight
+
+    def speed_kmh(self, eid: int) -> float:
+        """Speed an edge is actually driven at: the live speed, else the slowed-down limit."""
+        live = self.live_kmh[eid]
+        return float(self.limit_kmh[eid] / self.realistic_factor if np.isnan(live) else live)
+
+    def top_speed_kmh(self) -> float:
+        """Fastest speed any edge is driven at, for turning distance bounds into time bounds."""
+        live = self.live_kmh[~np.isnan(self.live_kmh)]
+        top = self.limit_kmh.max() / self.realistic_factor
+        return float(max(top, live.max()) if len(live) else top)
+
+    def is_closed(self, eid: int) -> bool:
+        return bool(self.closed[eid])
+
+    def info(self) -> Dict:
+        return {
+            "version": self.version,
+            "live_speed_edges": int(np.count_nonzero(~np.isnan(self.live_kmh))),
+            "closed_edges": int(np.count_nonzero(self.closed)),
+            "updated_at": None if self.updated_at is None
+            else time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.updated_at)),
+        }
+
+
+def traffic_feed_path(name: str, feed_dir: Optional[str] = None) -> str:
+    """
+    Resolve a traffic feed name inside the feed directory.
+
+    Raises:
+        ValueError: If the name resolves outside the directory (absolute paths, "..", symlinks)
+    """
+    root = os.path.realpath(feed_dir or os.environ.get("TRAFFIC_FEED_DIR", DEFAULT_TRAFFIC_FEED_DIR))
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"Traffic feed {name} is outside the feed directory")
+    return path
+
+
+def load_traffic_feed(path: str) -> List[Dict]:
+    """
+    Read edge update rows from a local traffic feed file.
+
+    Args:
+        path: .json file with a list of update objects, or .csv with a
+            u,v[,key][,speed_kmh][,closed] header; empty cells are left unchanged
+
+    Returns:
+        Unvalidated update rows, CSV values still strings
+
+    Raises:
+        ValueError: If the file is not valid JSON or CSV, or the JSON is not a list
+    """
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            rows = json.load(f)
+        if not isinstance(rows, list):
+            raise ValueError("A JSON traffic feed must be a list of updates")
+        return rows
+
+    with open(path, newline="", encoding="utf-8") as f:
+        return [
+            {column: value for column, value in row.items() if value not in (None, "")}
+            for row in csv.DictReader(f)
+        ]
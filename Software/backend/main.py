@@ -1,9 +1,30 @@
+import os
+import tracemalloc
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
 from backend.api.routes import api_router
+from backend.api.compression import CompressionMiddleware
+from backend.api.server_timing import ServerTimingMiddleware
+from backend.core.region_registry import registry
+from backend.core.warmup import start_background_warmup, stop_background_warmup
 import logging
-app = FastAPI()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # TRACEMALLOC=<frames> traces Python allocations for /health/memory, at a large speed cost
+    if os.environ.get("TRACEMALLOC"):
+        tracemalloc.start(int(os.environ["TRACEMALLOC"]))
+    # Regions from backend/config/regions.json load in the background, /health/ready reports progress
+    start_background_warmup(registry)
+    yield
+    stop_background_warmup()
+
+
+app = FastAPI(default_response_class=ORJSONResponse, lifespan=lifespan)
 
 
 logger = logging.getLogger("uvicorn")
@@ -19,6 +40,12 @@ app.add_middleware(
     expose_headers=["*"]  
 )
 
+# Compress JSON responses above 1 KB with brotli or gzip, whichever the client accepts
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+# Added last so it is outermost and its total covers compression
+app.add_middleware(ServerTimingMiddleware)
+
 app.mount("/data/routes", StaticFiles(directory="backend/data/routes"), name="routes")
 app.mount("/data/graphs", StaticFiles(directory="backend/data/OSM graphs"), name="graphs")
 
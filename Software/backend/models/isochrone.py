@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field, PositiveFloat
+from typing import Any, Dict, List, Optional
+
+class IsochroneRequest(BaseModel):
+    coords: List[float]  # [lat, lon]
+    minutes: List[PositiveFloat] = Field(default=[5, 10, 15], min_length=1)  # time bands, all from one search
+    include_nodes: bool = True
+    hull_ratio: float = Field(default=0.3, ge=0, le=1)  # 0 = tightest concave hull, 1 = convex hull
+
+class IsochroneBand(BaseModel):
+    minutes: float
+    node_count: int
+    polygon: Dict[str, Any]  # GeoJSON geometry, [lon, lat] order
+    nodes: Optional[List[int]] = None
+
+class IsochroneResponse(BaseModel):
+    center: List[float]  # snapped start position [lat, lon]
+    settled_nodes: int
+    bands: List[IsochroneBand]
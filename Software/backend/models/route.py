@@ -1,17 +1,48 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional
 
 class RouteRequest(BaseModel):
     source_coords: List[float]  # [lat, lon]
     dest_coords: List[float]    # [lat, lon]
+    snap: Literal["edge", "vector"] = "edge"  # nearest road segment, or nearest node vectors in Qdrant
+    metric: Literal["distance", "time"] = "distance"  # shortest, or fastest under live traffic
+    fetch_mode: Literal["corridor", "bbox"] = "corridor"  # area downloaded when no loaded region covers the route
+    geometry: Literal["full", "polyline"] = "full"  # "polyline" returns an encoded polyline instead of waypoints
+    precision: int = Field(default=5, ge=1, le=7)  # polyline decimal places
+    zoom: Optional[int] = Field(default=None, ge=0, le=22)  # simplify geometry for this map zoom level
+    include_path: bool = True
+    include_path_details: bool = False
+    render_maps: bool = True  # write the map files the frontend shows, off for load tests and API-only clients
 
 class RouteResponse(BaseModel):
     index: Optional[int] = None
     type: Optional[str] = None
-    path: List[int]
+    path: Optional[List[int]] = None
     distance_km: float
     ideal_time_min: float
     realistic_time_min: float
     average_speed_kmh: float
-    waypoints: List[List[float]]
+    waypoints: Optional[List[List[float]]] = None
+    polyline: Optional[str] = None
+    precision: Optional[int] = None
+    path_details: Optional[List[Dict[str, Any]]] = None
 
+class RerouteRequest(BaseModel):
+    session_id: Optional[str] = None  # from the previous /reroute response, None opens a new session
+    source_coords: List[float]  # [lat, lon]
+    dest_coords: List[float]    # [lat, lon]
+    metric: Literal["distance", "time"] = "distance"
+    geometry: Literal["full", "polyline"] = "full"
+    precision: int = Field(default=5, ge=1, le=7)
+    zoom: Optional[int] = Field(default=None, ge=0, le=22)
+    include_path: bool = True
+    include_path_details: bool = False
+
+class RerouteSession(BaseModel):
+    session_id: str
+    reused_tree: bool  # False when the tree was (re)built for this request
+    settled: int  # nodes this request added to the tree
+    tree_nodes: int
+
+class RerouteResponse(RouteResponse):
+    session: RerouteSession
@@ -0,0 +1,19 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+
+class EdgeUpdate(BaseModel):
+    u: int
+    v: int
+    key: Optional[int] = None  # None updates all parallel u -> v edges
+    speed_kmh: Optional[float] = Field(default=None, gt=0)  # live speed, None leaves it unchanged
+    closed: Optional[bool] = None  # None leaves the closure unchanged
+
+class TrafficUpdateRequest(BaseModel):
+    updates: List[EdgeUpdate] = []
+    feed_file: Optional[str] = None  # .csv/.json feed in the traffic feed directory, applied after updates
+    reset: bool = False  # drop all live speeds and closures first
+
+class TrafficUpdateResponse(BaseModel):
+    received: int
+    elapsed_ms: float
+    regions: Dict[str, Dict[str, Any]]
@@ -0,0 +1,390 @@
+"""
+Offline routing API tests on a synthetic street grid.
+
+Run from the Software directory:
+    python -m pytest backend/test_routing.py
+"""
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import networkx as nx
+import osmnx as ox
+import pytest
+from fastapi.testclient import TestClient
+from shapely.geometry import box
+
+from backend.benchmarks.overpass_standin import StandInOverpass
+from backend.benchmarks.synthetic import grid_road_graph
+from backend.core.graph_slim import HIGHWAY_ATTR, highway_code, road_type
+from backend.core.osm_data_loader import download_polygon_graph, merge_tile_graphs, split_into_tiles
+from backend.core.region_registry import graph_bbox, radius_bbox, registry
+from backend.core.route_sessions import RouteSessionCache, route_sessions
+from backend.core.vector_db import VectorDatabase
+from backend.main import app
+
+REGION = "test-grid"
+
+
+@pytest.fixture(scope="module")
+def grid_region():
+    # Registered directly, the app's lifespan (warm-up of configured regions) is not run
+    region = registry.register(REGION, grid_road_graph(20), source="test", pinned=True)
+    yield region
+    with registry._lock:
+        registry.regions.pop(REGION, None)
+    region.db.close()
+
+
+@pytest.fixture(scope="module")
+def client(grid_region):
+    return TestClient(app)
+
+
+def point_on_edge(graph, u, v, fraction):
+    x = graph.nodes[u]["x"] + fraction * (graph.nodes[v]["x"] - graph.nodes[u]["x"])
+    y = graph.nodes[u]["y"] + fraction * (graph.nodes[v]["y"] - graph.nodes[u]["y"])
+    return [y, x]
+
+
+def interior_edge(graph):
+    """A two-way street in the middle of the grid, away from the region's edge margin."""
+    return next((u, v) for u, v in graph.edges() if u == 210 and graph.has_edge(v, u))
+
+
+def test_optimal_route_along_one_edge(client, grid_region):
+    graph = grid_region.graph
+    u, v = interior_edge(graph)
+    response = client.post("/route/optimal", json={
+        "source_coords": point_on_edge(graph, u, v, 0.3),
+        "dest_coords": point_on_edge(graph, u, v, 0.7),
+        "render_maps": False,
+    })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["path"] == []
+    assert len(body["waypoints"]) == 2
+    length_km = min(data["length"] for data in graph[u][v].values()) / 1000
+    assert body["distance_km"] == pytest.approx(0.4 * length_km, rel=1e-3)
+
+
+def test_point_region_must_cover_isochrone_radius(grid_region):
+    center = [grid_region.graph.nodes[210]["y"], grid_region.graph.nodes[210]["x"]]
+
+    assert registry.find([center], bbox=radius_bbox(*center, 0.5)) is grid_region
+    # The grid is about 3 km across, a 5 km radius runs past its boundary
+    assert registry.find([center], bbox=radius_bbox(*center, 5)) is None
+
+
+@pytest.fixture
+def feed_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("TRAFFIC_FEED_DIR", str(tmp_path))
+    yield tmp_path
+    registry.reset_traffic()
+
+
+def test_traffic_feed_outside_feed_dir_is_rejected(client, feed_dir, tmp_path_factory):
+    outside = tmp_path_factory.mktemp("elsewhere") / "feed.csv"
+    outside.write_text("u,v,speed_kmh\n210,211,30\n")
+
+    for name in (str(outside), f"../{outside.parent.name}/feed.csv"):
+        response = client.post("/route/traffic", json={"feed_file": name})
+        assert response.status_code == 400
+
+
+@pytest.mark.parametrize("rows", [
+    "u,v,speed_kmh\n210,211,0\n",
+    "u,v,speed_kmh\n210,211,-20\n",
+    "v,speed_kmh\n211,30\n",
+    "u,v,speed_kmh\n210,211,fast\n",
+])
+def test_invalid_traffic_feed_rows_are_rejected(client, grid_region, feed_dir, rows):
+    (feed_dir / "feed.csv").write_text(rows)
+    version = grid_region.db.overlay.version
+
+    response = client.post("/route/traffic", json={"feed_file": "feed.csv"})
+
+    assert response.status_code == 422
+    assert response.json()["detail"]["feed_row"] == 1
+    assert grid_region.db.overlay.version == version
+
+
+def test_traffic_feed_updates_edge_speeds(client, grid_region, feed_dir):
+    u, v = interior_edge(grid_region.graph)
+    (feed_dir / "feed.csv").write_text(f"u,v,speed_kmh,closed\n{u},{v},15,\n")
+
+    response = client.post("/route/traffic", json={"feed_file": "feed.csv"})
+
+    assert response.status_code == 200
+    assert response.json()["regions"][REGION]["updated_edges"] == len(grid_region.graph[u][v])
+
+
+def test_landmarks_only_for_pinned_regions(grid_region):
+    assert grid_region.db.landmark_index is not None
+
+    # A region downloaded for a request routes with plain Dijkstra rather than wait for landmarks
+    region = registry.register("test-unpinned", grid_road_graph(5), source="test")
+    try:
+        assert region.db.landmark_index is None
+        assert region.db.find_optimal_route([46.306, 16.337], [46.309, 16.344])["path"]
+    finally:
+        with registry._lock:
+            registry.regions.pop(region.name, None)
+        region.db.close()
+
+
+def test_reroute_along_one_edge(client, grid_region):
+    graph = grid_region.graph
+    u, v = interior_edge(graph)
+    response = client.post("/route/reroute", json={
+        "source_coords": point_on_edge(graph, u, v, 0.3),
+        "dest_coords": point_on_edge(graph, u, v, 0.7),
+    })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["path"] == []
+    length_km = min(data["length"] for data in graph[u][v].values()) / 1000
+    assert body["distance_km"] == pytest.approx(0.4 * length_km, rel=1e-3)
+
+
+def random_points(graph, count, seed=0):
+    west, south, east, north = graph_bbox(graph)
+    rng = random.Random(seed)
+    return [[rng.uniform(south, north), rng.uniform(west, east)] for _ in range(count)]
+
+
+def route_cost(result, metric):
+    return result["realistic_time_min"] if metric == "time" else result["distance_km"]
+
+
+@pytest.mark.parametrize("metric", ["distance", "time"])
+def test_session_tree_matches_fresh_search(grid_region, metric):
+    db = grid_region.db
+    source, *destinations = random_points(grid_region.graph, 40)
+    session = RouteSessionCache().get_or_create(None, grid_region)
+
+    for dest in destinations:
+        path, src, dst = db._route_from_edge_snaps(source, dest, metric)
+        fresh = db._route_result(path, metric, src, dst)
+        result = session.route(source, dest, metric)
+        assert route_cost(result, metric) == pytest.approx(route_cost(fresh, metric), abs=1e-9)
+    assert session.rebuilds == 1
+
+
+def test_session_rebuilds_when_traffic_changes_mid_query(grid_region, monkeypatch):
+    db = grid_region.db
+    source, dest = random_points(grid_region.graph, 2, seed=1)
+    session = RouteSessionCache().get_or_create(None, grid_region)
+    u, v = interior_edge(grid_region.graph)
+    route_from_tree = db.route_from_tree
+
+    def route_during_update(*args, **kwargs):
+        # The first query sees a traffic update land while it extends the tree
+        monkeypatch.setattr(db, "route_from_tree", route_from_tree)
+        db.overlay.apply_updates([{"u": u, "v": v, "speed_kmh": 5}])
+        return route_from_tree(*args, **kwargs)
+
+    monkeypatch.setattr(db, "route_from_tree", route_during_update)
+    try:
+        result = session.route(source, dest, "time")
+        path, src, dst = db._route_from_edge_snaps(source, dest, "time")
+        fresh = db._route_result(path, "time", src, dst)
+        assert session.rebuilds == 2
+        assert session.version == db.overlay.version
+        assert route_cost(result, "time") == pytest.approx(route_cost(fresh, "time"), abs=1e-9)
+    finally:
+        db.overlay.reset()
+
+
+def test_sessions_dropped_with_their_region():
+    region = registry.register("test-sessions", grid_road_graph(5), source="test")
+    session = route_sessions.get_or_create(None, region)
+
+    # Re-registering the name drops the old region, and its sessions with it
+    replacement = registry.register("test-sessions", grid_road_graph(5), source="test")
+    try:
+        assert session.session_id not in route_sessions.sessions
+    finally:
+        with registry._lock:
+            registry.regions.pop(replacement.name, None)
+        replacement.db.close()
+
+
+def test_sessions_bounded_by_total_tree_nodes(grid_region):
+    sessions = RouteSessionCache(max_tree_nodes=300)
+    points = random_points(grid_region.graph, 6, seed=2)
+    first = sessions.get_or_create(None, grid_region)
+    first.route(points[0], points[1], "distance")
+    second = sessions.get_or_create(None, grid_region)
+    second.route(points[2], points[3], "distance")
+    assert first.tree_nodes + second.tree_nodes > 300
+
+    sessions.get_or_create(second.session_id, grid_region)
+
+    assert list(sessions.sessions) == [second.session_id]
+
+
+@pytest.fixture
+def clean_traffic(grid_region):
+    yield grid_region.db.overlay
+    grid_region.db.overlay.reset()
+
+
+def test_route_from_a_road_closed_in_the_snapped_direction(grid_region, clean_traffic):
+    db = grid_region.db
+    u, v = interior_edge(grid_region.graph)
+    click = point_on_edge(grid_region.graph, u, v, 0.5)
+    dest = random_points(grid_region.graph, 1, seed=3)[0]
+    snapped = db.edge_index.snap(*click)
+    # Both directions share the geometry, close only the one the index picked
+    clean_traffic.apply_updates([{"u": snapped["u"], "v": snapped["v"], "closed": True}])
+
+    result = db.find_optimal_route(click, dest, render_maps=False)
+
+    assert "error" not in result
+    assert result["path"][0] == snapped["u"]
+
+
+def test_snap_skips_roads_closed_both_ways(grid_region, clean_traffic):
+    db = grid_region.db
+    u, v = interior_edge(grid_region.graph)
+    click = point_on_edge(grid_region.graph, u, v, 0.5)
+    clean_traffic.apply_updates([{"u": u, "v": v, "closed": True}, {"u": v, "v": u, "closed": True}])
+
+    snapped = db.edge_index.snap(*click, weight=clean_traffic.weight("length"))
+
+    assert {snapped["u"], snapped["v"]} != {u, v}
+    assert "error" not in db.find_optimal_route(click, random_points(grid_region.graph, 1, seed=3)[0], render_maps=False)
+
+
+def test_live_speed_in_one_direction_leaves_the_other_unchanged(grid_region, clean_traffic):
+    edge_index = grid_region.db.edge_index
+    u, v = interior_edge(grid_region.graph)
+    snapped = edge_index.snap(*point_on_edge(grid_region.graph, u, v, 0.25))
+    weight = clean_traffic.weight("time")
+    before = edge_index.source_offsets(snapped, weight=weight)
+
+    clean_traffic.apply_updates([{"u": snapped["u"], "v": snapped["v"], "speed_kmh": 5}])
+    after = edge_index.source_offsets(snapped, weight=weight)
+
+    assert after[snapped["u"]] == pytest.approx(before[snapped["u"]])
+    assert after[snapped["v"]] > before[snapped["v"]]
+
+
+def test_traffic_replay_keeps_the_latest_update_order(grid_region):
+    u, v = interior_edge(grid_region.graph)
+    registry.apply_traffic([
+        {"u": u, "v": v, "key": None, "speed_kmh": 50},
+        {"u": u, "v": v, "key": 0, "speed_kmh": 10},
+        {"u": u, "v": v, "key": None, "speed_kmh": 30},
+    ])
+    try:
+        region = registry.register("test-replay", grid_road_graph(20), source="test")
+        try:
+            for db in (grid_region.db, region.db):
+                eid = db.overlay.resolve(u, v, 0)[0]
+                assert db.overlay.live_kmh[eid] == 30
+        finally:
+            with registry._lock:
+                registry.regions.pop(region.name, None)
+            region.db.close()
+    finally:
+        registry.reset_traffic()
+
+
+def test_alternatives_start_and_end_where_the_optimal_route_does(client, grid_region):
+    graph = grid_region.graph
+    request = {
+        "source_coords": [graph.nodes[210]["y"], graph.nodes[210]["x"]],
+        "dest_coords": [graph.nodes[215]["y"], graph.nodes[215]["x"]],
+        "render_maps": False,
+    }
+
+    optimal = client.post("/route/optimal", json=request).json()
+    response = client.post("/route/alternative", json=request)
+
+    assert response.status_code == 200
+    alternatives = response.json()["alternatives"]
+    assert alternatives[0]["distance_km"] == pytest.approx(optimal["distance_km"])
+    for alternative in alternatives:
+        assert alternative["waypoints"][0] == pytest.approx(optimal["waypoints"][0])
+        assert alternative["waypoints"][-1] == pytest.approx(optimal["waypoints"][-1])
+
+
+@pytest.fixture(scope="module")
+def overpass():
+    """osmnx pointed at the stand-in Overpass serving the Varaždin raw export."""
+    standin = StandInOverpass().start()
+    saved = ox.settings.overpass_url, ox.settings.overpass_rate_limit, ox.settings.use_cache
+    ox.settings.overpass_url, ox.settings.overpass_rate_limit, ox.settings.use_cache = standin.url, False, False
+    yield standin
+    ox.settings.overpass_url, ox.settings.overpass_rate_limit, ox.settings.use_cache = saved
+    standin.stop()
+
+
+def graph_summary(graph):
+    return graph.number_of_nodes(), graph.number_of_edges(), round(sum(d["length"] for _, _, d in graph.edges(data=True)))
+
+
+def test_tiled_download_matches_single_request(overpass):
+    area = box(16.300, 46.290, 16.370, 46.330)
+    assert len(split_into_tiles(area, 2)) > 1
+
+    single = download_polygon_graph(area, tile_km=None)
+    requests = overpass.requests
+    tiled = download_polygon_graph(area, tile_km=2, max_workers=2)
+
+    assert overpass.requests - requests > 1
+    assert graph_summary(tiled) == graph_summary(single)
+
+
+def test_merge_keeps_border_segments_once():
+    def tile(*edges):
+        graph = nx.MultiDiGraph(crs="epsg:4326")
+        for u, v, way in edges:
+            graph.add_node(u, x=float(u), y=0.0)
+            graph.add_node(v, x=float(v), y=0.0)
+            graph.add_edge(u, v, osmid=way, length=1.0)
+        return graph
+
+    # Segment 2 -> 3 of way 20 crosses the border and comes back in both tiles
+    merged = merge_tile_graphs([tile((1, 2, 10), (2, 3, 20)), tile((2, 3, 20), (3, 4, 30), (2, 3, 21))])
+
+    assert sorted(merged.edges(data="osmid")) == [(1, 2, 10), (2, 3, 20), (2, 3, 21), (3, 4, 30)]
+
+
+def test_highway_codes_are_distinct_under_concurrent_slimming():
+    names = [f"test_road_{i}" for i in range(200)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        codes = list(pool.map(highway_code, names * 4))
+
+    assert len(set(codes)) == len(names)
+    assert [road_type({HIGHWAY_ATTR: code}) for code in codes[:len(names)]] == names
+
+
+@pytest.mark.parametrize("minutes", [[-5], [0], [5, -1]])
+def test_isochrone_rejects_non_positive_minutes(client, grid_region, minutes):
+    center = [grid_region.graph.nodes[210]["y"], grid_region.graph.nodes[210]["x"]]
+    response = client.post("/route/isochrone", json={"coords": center, "minutes": minutes})
+
+    assert response.status_code == 422
+
+
+def test_similar_nodes_from_reloaded_landmark_vectors(tmp_path, capsys):
+    built = VectorDatabase(storage_path=str(tmp_path), landmarks=4)
+    built.create_embeddings(grid_road_graph(15))
+    built.close()
+
+    db = VectorDatabase(storage_path=str(tmp_path), landmarks=4)
+    try:
+        db.create_embeddings(grid_road_graph(15))
+        assert "Reusing stored landmark vectors" in capsys.readouterr().out
+
+        # Grid neighbours are the closest in road distance to every landmark
+        node = 112
+        hits = db.similar_nodes(node, limit=5)
+        assert node not in [hit["node"] for hit in hits]
+        assert {hit["node"] for hit in hits[:4]} == set(nx.all_neighbors(db.graph, node))
+    finally:
+        db.close()